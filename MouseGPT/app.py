@@ -2,8 +2,21 @@
 # ============================
 # БЛОК ИМПОРТОВ
 # ============================
+# Асинхронный режим Socket.IO выбирается до остальных импортов: eventlet и gevent
+# заменяют блокирующие функции стандартной библиотеки кооперативными
+from back.config import SOCKETIO_ASYNC_MODE
+if SOCKETIO_ASYNC_MODE == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif SOCKETIO_ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
 # Импорт стандартных библиотек
 import os
+import re
+import uuid
+import secrets
 import logging
 
 # Импорт библиотеки для загрузки переменных окружения из файла .env
@@ -11,14 +24,16 @@ from dotenv import load_dotenv
 
 # Импорт внешних библиотек
 import openai
-from flask import Flask, render_template, redirect, url_for, send_from_directory, request, session
-from flask_socketio import SocketIO, emit
-from werkzeug.utils import secure_filename
+from flask import Flask, render_template, redirect, url_for, send_from_directory, request, session, jsonify
+from flask_socketio import SocketIO, emit, join_room
 
 # Импорт внутренних библиотек
-from back.tools.process_file import process_file, process_pdf_file, process_ipynb_file, process_video_file, process_audio_file
+from back.tools.process_file import process_file, save_upload, process_pdf_file, process_ipynb_file, process_video_file, process_audio_file
 from back.file_manager import FileManager
 from back.agent import BaseAgent
+from back.config import JOBS_DIRECTORY, SECRET_KEY, SESSION_MAX_JOBS, WORKSPACE_TTL_S, WORKSPACE_SWEEP_INTERVAL_S
+from back.jobs import JobManager, JobContext, JobQueueFull, COMPLETED
+from back.rag import source_pages
 
 # LangSmith импорты:
 from langsmith import traceable
@@ -55,7 +70,7 @@ file_manager = FileManager()
 # Инициализация агента
 agent = BaseAgent(
     llm=openai,
-    system_prompt=file_manager.read_document('prompts/system_prompt.txt'),
+    system_prompt=file_manager.read_prompt('prompts/system_prompt.txt'),
     tools=[]
 )
 
@@ -64,9 +79,33 @@ agent = BaseAgent(
 # ============================
 # Flask веб-приложение
 app = Flask(__name__)
-app.config['SECRET_KEY'] = 'SECRET!'
-app.config['UPLOAD_FOLDER'] = file_manager.working_directory
-socketio = SocketIO(app, cors_allowed_origins="*")
+if not SECRET_KEY:
+    logger.warning("SECRET_KEY is not set, using a random key: sessions will not survive a restart")
+app.config['SECRET_KEY'] = SECRET_KEY or secrets.token_hex(32)
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=SOCKETIO_ASYNC_MODE)
+
+@app.before_request
+def assign_workspace():
+    """
+    Description:
+        Назначает сессии отдельное рабочее пространство для загруженных файлов и результатов обработки.
+        Пространство назначается при первом HTTP запросе, поэтому оно доступно и в обработчиках Socket.IO.
+
+    Returns:
+        None
+    """
+    if 'workspace_id' not in session:
+        session['workspace_id'] = uuid.uuid4().hex
+
+def session_workspace():
+    """
+    Description:
+        Возвращает директорию рабочего пространства текущей сессии.
+
+    Returns:
+        Path: Путь к рабочему пространству.
+    """
+    return file_manager.workspace(session['workspace_id'])
 
 @app.route('/', methods=['GET', 'POST'])
 def upload_file():
@@ -97,107 +136,191 @@ def upload_file():
             return redirect(request.url)
         
         if file:
-            # Получаем безопасное имя файла, чтобы избежать проблем с системой файлов
-            filename = secure_filename(file.filename)
-            
-            # Формируем полный путь для сохранения файла
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            
-            # Сохраняем файл на сервере
-            file.save(file_path)
+            # Сохраняем файл в рабочем пространстве сессии под безопасным уникальным путем
+            save_upload(file, session_workspace())
     
     # Если метод GET или файл не был успешно загружен, отображаем страницу загрузки
     return render_template('html/home.html')
 
+def run_processing_job(job: JobContext) -> dict:
+    """
+    Description:
+        Выполняет фоновую задачу обработки файла: извлечение чанков, суммаризацию и финальное резюме.
+
+    Args:
+        job: Контекст фоновой задачи.
+
+    Returns:
+        Словарь с результатами обработки (имя файла суммаризации, FAISS индекса и т.д.).
+    """
+    processor = FILE_TYPES[job.job['kind']]['processor']
+    return process_file(job.job['file_path'], agent, file_manager, processor,
+                        job.job['params'].get('chunk_prompt_type', 'text'), job=job)
+
+def submit_processing_job(kind: str):
+    """
+    Description:
+        Сохраняет загруженный файл и ставит его обработку в очередь фоновых задач.
+
+    Args:
+        kind: Тип файла (ключ FILE_TYPES).
+
+    Returns:
+        JSON с идентификатором задачи и кодом 202 или сообщение об ошибке с кодом состояния HTTP.
+    """
+    if 'file_path' not in request.files:
+        return "No file provided", 400
+
+    try:
+        file_path = save_upload(request.files['file_path'], session_workspace())
+        job = job_manager.submit(kind, file_path, {'chunk_prompt_type': 'text',
+                                                   'workspace_id': session['workspace_id']})
+    except ValueError as e:
+        return str(e), 400
+    except JobQueueFull:
+        return "Too many files are being processed, try again later", 429
+
+    # Запоминаем задачи пользователя, чтобы найти результат при скачивании и в чате
+    session['job_ids'] = ((session.get('job_ids') or []) + [job['id']])[-SESSION_MAX_JOBS:]
+    return jsonify(job_manager.public_view(job)), 202
+
+def owned_job(job_id: str):
+    """
+    Description:
+        Возвращает задачу, если она принадлежит рабочему пространству текущей сессии.
+
+    Args:
+        job_id: Идентификатор задачи.
+
+    Returns:
+        Состояние задачи или None, если задача не найдена или принадлежит другому пользователю.
+    """
+    job = job_manager.get(job_id) if job_id else None
+    if job and job['params'].get('workspace_id') == session.get('workspace_id'):
+        return job
+    return None
+
+def latest_job_result(key: str, job_id: str = None):
+    """
+    Description:
+        Возвращает значение из результата указанной или последней завершенной задачи пользователя.
+
+    Args:
+        key: Ключ в результате задачи (например, 'summary_filename').
+        job_id: Идентификатор задачи или None для поиска среди задач текущей сессии.
+
+    Returns:
+        Значение из результата задачи или None, если подходящая задача не найдена.
+    """
+    job_ids = [job_id] if job_id else reversed(session.get('job_ids') or [])
+    for candidate in job_ids:
+        job = owned_job(candidate)
+        if job and job['state'] == COMPLETED and job['result'].get(key):
+            return job['result'][key]
+    return None
+
 @app.route('/process_pdf', methods=['POST'])
 def process_pdf():
     """
     Description:
-        Обрабатывает PDF файл и создает его суммаризацию.
+        Ставит в очередь обработку PDF файла и создание его суммаризации.
 
     Args:
         None
 
     Returns:
-        HTML-страница с суммаризацией PDF файла.
+        JSON с идентификатором фоновой задачи.
 
     Raises:
         None
     """
-    if 'file_path' not in request.files:
-        return "No file provided", 400
-
-    file = request.files['file_path']
-    summary_filename = process_file(file, agent, file_manager, session, process_pdf_file, 'text')
-    return f"PDF summarization is ready: {summary_filename}"
+    return submit_processing_job('pdf')
 
 @app.route('/process_ipynb', methods=['POST'])
 def process_ipynb():
     """
     Description:
-        Обрабатывает .ipynb файл и создает его суммаризацию.
+        Ставит в очередь обработку .ipynb файла и создание его суммаризации.
 
     Args:
         None
 
     Returns:
-        HTML-страница с суммаризацией .ipynb файла.
+        JSON с идентификатором фоновой задачи.
 
     Raises:
         None
     """
-    if 'file_path' not in request.files:
-        return "No file provided", 400
-
-    file = request.files['file_path']
-    summary_filename = process_file(file, agent, file_manager, session, process_ipynb_file, 'text')
-    return f"Notebook summarization is ready: {summary_filename}"
+    return submit_processing_job('notebook')
 
 @app.route('/process_audio', methods=['POST'])
 def process_audio():
     """
     Description:
-        Обрабатывает загруженный аудиофайл и создает его транскрипцию и суммаризацию.
+        Ставит в очередь транскрипцию и суммаризацию загруженного аудиофайла.
 
     Args:
         None (данные получаются из request.files)
 
     Returns:
-        str: Сообщение о готовности транскрипции и суммаризации аудио с именем файла суммаризации.
+        JSON с идентификатором фоновой задачи.
         tuple: В случае ошибки возвращает сообщение об ошибке и код состояния HTTP.
 
     Raises:
         None (исключения обрабатываются внутри функции)
     """
-    if 'file_path' not in request.files:
-        return "No file provided", 400
-
-    file = request.files['file_path']
-    summary_filename = process_file(file, agent, file_manager, session, process_audio_file, 'text')
-    return f"Audio transcription and summarization are ready: {summary_filename}"
+    return submit_processing_job('audio')
 
 @app.route('/process_video', methods=['POST'])
 def process_video():
     """
     Description:
-        Обрабатывает загруженный видеофайл, транскрибирует его и создает суммаризацию.
+        Ставит в очередь транскрипцию и суммаризацию загруженного видеофайла.
 
     Args:
         None (данные получаются из request.files)
 
     Returns:
-        str: Сообщение о готовности транскрибации и суммаризации видео с именем файла суммаризации.
+        JSON с идентификатором фоновой задачи.
         tuple: В случае ошибки возвращает сообщение об ошибке и код состояния HTTP.
 
     Raises:
         None (исключения обрабатываются внутри функции)
     """
-    if 'file_path' not in request.files:
-        return "No file provided", 400
+    return submit_processing_job('video')
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id: str):
+    """
+    Description:
+        Возвращает состояние фоновой задачи.
+
+    Args:
+        job_id: Идентификатор задачи.
 
-    file = request.files['file_path']
-    summary_filename = process_file(file, agent, file_manager, session, process_video_file, 'text')
-    return f"Video transcription and summarization are ready: {summary_filename}"
+    Returns:
+        JSON с состоянием задачи или 404, если задача не найдена.
+    """
+    job = owned_job(job_id)
+    if not job:
+        return "Job not found", 404
+    return jsonify(job_manager.public_view(job))
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id: str):
+    """
+    Description:
+        Отменяет фоновую задачу.
+
+    Args:
+        job_id: Идентификатор задачи.
+
+    Returns:
+        JSON с состоянием задачи или 409, если задача уже завершена или не найдена.
+    """
+    if not owned_job(job_id) or not job_manager.cancel(job_id):
+        return "Job not found or already finished", 409
+    return jsonify(job_manager.public_view(job_manager.get(job_id)))
 
 @app.route('/download_summary')
 def download_summary():
@@ -216,7 +339,7 @@ def download_summary():
     """
     try:
         # Убедимся, что файл существует перед попыткой его отправки
-        summary_filename = session.get('summary_filename', None)
+        summary_filename = latest_job_result('summary_filename', request.args.get('job_id'))
         if not summary_filename:
             return "Summary file not found", 404
         
@@ -246,8 +369,11 @@ def handle_message(data):
     """
     message = data.get('message')
     if "@RAG" in message:
-        # Загружаем faiss индекс из сессии для дальнейшего использования
-        faiss_index_filename = session.get('faiss_index_filename', None)
+        # Маркер @RAG — команда, а не часть вопроса: в поиске редкий термин снижал бы уверенность BM25
+        question = re.sub(r'\s*@RAG\s*', ' ', message).strip()
+
+        # Находим faiss индекс по задаче, переданной клиентом, или по задачам сессии
+        faiss_index_filename = latest_job_result('faiss_index_filename', data.get('job_id'))
 
         if not faiss_index_filename:
             emit('response', {'message': 'Faiss index not found'})
@@ -256,15 +382,77 @@ def handle_message(data):
         # Загружаем соответствующий Faiss индекс (например, последний загруженный PDF файл)
         faiss_index = file_manager.load_faiss_index(faiss_index_filename)
 
-        # Используем RAG для ответа на запрос
-        response = agent.search_rag(message, faiss_index)
-        
-        # Преобразуем ответ в JSON-сериализуемый формат
-        response_dict = {
-            "output_text": response["output_text"]
-        }
-        
-        emit('response', {'message': response_dict['output_text']})
+        # BM25 индекс того же документа (для файлов, загруженных до его появления, его может не быть)
+        bm25_index_filename = latest_job_result('bm25_index_filename', data.get('job_id'))
+        bm25_index = file_manager.load_bm25_index(bm25_index_filename) if bm25_index_filename else None
+
+        # Используем RAG для ответа на запрос: токены отправляются клиенту по мере генерации
+        stream_id = uuid.uuid4().hex
+        try:
+            for event in agent.stream_rag(question, faiss_index, lexical_index=bm25_index):
+                if event['type'] == 'token':
+                    emit('response_token', {'stream_id': stream_id, 'token': event['text']})
+                    # Отдаем управление, чтобы событие ушло клиенту сразу (eventlet/gevent)
+                    socketio.sleep(0)
+                else:
+                    emit('response_end', {
+                        'stream_id': stream_id,
+                        'message': event['output_text'],
+                        'sources': source_pages(event['source_documents'])
+                    })
+        except Exception as e:
+            logger.error(f"Error during RAG answer: {e}")
+            emit('response_end', {'stream_id': stream_id, 'message': 'An error occurred while answering', 'sources': []})
+
+@socketio.on('subscribe_job')
+def handle_subscribe_job(data):
+    """
+    Description:
+        Подписывает клиента на события прогресса фоновой задачи.
+
+    Args:
+        data: Данные, отправленные клиентом ({'job_id': ...}).
+
+    Returns:
+        None
+    """
+    job = owned_job(data.get('job_id', ''))
+    if not job:
+        emit('job_done', {'job_id': data.get('job_id'), 'state': 'failed', 'error': 'Job not found'})
+        return
+
+    join_room(job['id'])
+    # Отправляем текущее состояние, чтобы клиент не пропустил события, произошедшие до подписки
+    emit('job_done' if job['state'] in ('completed', 'failed', 'cancelled') else 'job_progress',
+         job_manager.public_view(job))
+
+# Инициализация менеджера фоновых задач; прогресс отправляется в комнату Socket.IO задачи
+job_manager = JobManager(
+    state_directory=file_manager.working_directory / JOBS_DIRECTORY,
+    runner=run_processing_job,
+    notify=lambda event, payload, job_id: socketio.emit(event, payload, to=job_id),
+    # Вместе с задачей удаляется директория загрузки: файл, суммаризация, FAISS и BM25 индексы
+    cleanup=lambda job: file_manager.remove_upload(job['file_path'])
+)
+job_manager.recover()
+
+def sweep_workspaces():
+    """
+    Description:
+        Фоновая задача: периодически удаляет загрузки старше WORKSPACE_TTL_S, на которые не ссылается
+        ни одна хранимая задача (например, файлы, загруженные без обработки), и пустые рабочие пространства.
+
+    Returns:
+        None
+    """
+    while True:
+        try:
+            file_manager.sweep_workspaces(WORKSPACE_TTL_S, keep=job_manager.file_paths())
+        except Exception as e:
+            logger.error(f"Error sweeping workspaces: {e}")
+        socketio.sleep(WORKSPACE_SWEEP_INTERVAL_S)
+
+socketio.start_background_task(sweep_workspaces)
 
 # Запуск приложения
 if __name__ == '__main__':
@@ -2,66 +2,118 @@
 # ============================
 # БЛОК ИМПОРТОВ
 # ============================
+# Импорт стандартных библиотек
+import threading
+
 # Импорт аннотаций типов
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional
 
 # Импорт для поиска по векторным представлениям
 import faiss
 
 # Импорт библиотек LangChain
 from langchain_openai import ChatOpenAI
-from langchain.chains.question_answering import load_qa_chain
 from langchain_community.vectorstores import FAISS
 
+# Импорт внутренних библиотек
+from back.config import RAG_LLM_MODEL
+from back.embeddings import get_embeddings
+from back.bm25 import BM25Index
+from back.rag import RAGAnswerer, Reranker
+from back.llm_cache import LLMResponseCache, get_llm_cache
+
 class BaseAgent():
     """
     Базовый класс для создания агентов.
+    Экземпляр агента общий для всех пользователей приложения, поэтому он не хранит историю диалога:
+    история передается в каждый вызов вызывающим кодом (например, отдельная для каждой задачи или сессии).
     """
 
-    def __init__(self, llm, system_prompt, tools: List[Any] = None):
+    def __init__(self, llm, system_prompt, tools: List[Any] = None, rag_chat_model: Any = None,
+                 response_cache: Optional[LLMResponseCache] = None):
         """
         Description:
             Инициализация агента.
 
         Args:
             tools: Список инструментов, доступных агенту.
+            rag_chat_model: Чат-модель LangChain для ответов по документам или None для ChatOpenAI
+                (например, GenericFakeChatModel для локальной проверки потоковых ответов).
+            response_cache: Кэш ответов LLM или None для общего кэша процесса (см. LLM_CACHE_PATH).
         """
         self.system_prompt = system_prompt
         self.llm = llm
-        self.messages: List[Dict[str, Any]] = []
+        self.response_cache = response_cache or get_llm_cache()
+        self.rag_chat_model = rag_chat_model
+        self._rag = None
+        self._rag_lock = threading.Lock()
 
-    def process_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
+    def process_message(self, message: Dict[str, Any],
+                        history: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         Description:
             Обрабатывает входящее сообщение и возвращает ответ.
+            Ответы на детерминированные запросы (низкая температура) берутся из постоянного кэша,
+            поэтому повторная обработка того же файла (например, после сбоя) не повторяет вызовы LLM.
 
         Args:
             message: Входящее сообщение.
+            history: История диалога, которой принадлежит сообщение (дополняется сообщением и ответом),
+                или None для независимого запроса без истории.
 
         Returns:
             Ответ агента.
         """
+        history = [] if history is None else history
         # Добавляем входящее сообщение в историю
-        self.messages.append({"role": "user", "content": message["content"]})
+        history.append({"role": "user", "content": message["content"]})
         
-        response = self.llm.chat.completions.create(
-            model="gpt-4o-mini", 
-            messages=[
-                {"role": "system", 
-                 "content": self.system_prompt},
-                *self.messages
-            ],
-            temperature=0.1,
-            top_p=0.9,
-            n = 10
-        ).choices[0].message.content
+        model = "gpt-4o-mini"
+        # Используется только первый вариант ответа, поэтому запрашивается один (n=1)
+        params = {"temperature": 0.1, "top_p": 0.9, "n": 1}
+
+        cache = self.response_cache if self.response_cache and self.response_cache.cacheable(params) else None
+        key = LLMResponseCache.make_key(model, self.system_prompt, history, params) if cache else None
+        response = cache.get(key) if cache else None
+
+        if response is None:
+            response = self.llm.chat.completions.create(
+                model=model, 
+                messages=[
+                    {"role": "system", 
+                     "content": self.system_prompt},
+                    *history
+                ],
+                **params
+            ).choices[0].message.content
+            if cache and response is not None:
+                cache.put(key, response)
 
         # Добавляем ответ агента в историю
-        self.messages.append({"role": "assistant", "content": response})
+        history.append({"role": "assistant", "content": response})
 
         return response
     
-    def search_rag(self, query: str, index: FAISS) -> str:
+    @property
+    def rag(self) -> RAGAnswerer:
+        """
+        Description:
+            Генератор ответов по документам, создаваемый один раз и переиспользуемый между сообщениями.
+
+        Returns:
+            RAGAnswerer: Генератор ответов с локальным переранжированием документов.
+        """
+        if self._rag is None:
+            with self._rag_lock:
+                if self._rag is None:
+                    self._rag = RAGAnswerer(
+                        chat_model=self.rag_chat_model or ChatOpenAI(model_name=RAG_LLM_MODEL, stream_usage=True),
+                        reranker=Reranker(embeddings=get_embeddings())
+                    )
+        return self._rag
+
+    def search_rag(self, query: str, index: FAISS, strategy: str = None,
+                   lexical_index: BM25Index = None) -> Dict[str, Any]:
         """
         Description:
             Выполняет поиск по базе знаний (RAG) и возвращает ответ.
@@ -69,23 +121,32 @@ class BaseAgent():
         Args:
             query: Запрос пользователя.
             index: Faiss индекс для поиска.
+            strategy: Стратегия генерации ('stuff', 'refine', 'map_reduce') или None для стратегии из настроек.
+            lexical_index: BM25 индекс документа для гибридного поиска или None для чисто векторного поиска.
         
         Returns:
-            Ответ на основе RAG.
+            Словарь с ответом ('output_text'), использованными документами ('source_documents')
+            и метриками задержки и токенов ('metrics').
         """
-        # Создаем цепочку для вопрос-ответ
-        qa_chain = load_qa_chain(ChatOpenAI(model_name="gpt-4o-mini"), chain_type="map_reduce")
-        
-        # Выполняем поиск
-        docs = index.similarity_search(query)
-        
-        # Генерируем ответ
-        answer = qa_chain.invoke({
-            "input_documents": docs, 
-            "question": query
-        })
-        
-        return answer
+        return self.rag.answer(query, index, strategy, lexical_index)
+
+    def stream_rag(self, query: str, index: FAISS, strategy: str = None,
+                   lexical_index: BM25Index = None) -> Iterator[Dict[str, Any]]:
+        """
+        Description:
+            Выполняет поиск по базе знаний (RAG) и возвращает ответ по мере генерации.
+
+        Args:
+            query: Запрос пользователя.
+            index: Faiss индекс для поиска.
+            strategy: Стратегия генерации ('stuff', 'refine', 'map_reduce') или None для стратегии из настроек.
+            lexical_index: BM25 индекс документа для гибридного поиска или None для чисто векторного поиска.
+
+        Yields:
+            События {'type': 'token', 'text': ...} и итоговое событие {'type': 'final', ...}
+            с полным ответом, использованными документами и метриками.
+        """
+        return self.rag.stream_answer(query, index, strategy, lexical_index)
 
     def save_faiss_index(self, index: faiss.Index, filename: str):
         """
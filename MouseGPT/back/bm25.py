@@ -0,0 +1,266 @@
+# back/bm25.py
+# ============================
+# БЛОК ИМПОРТОВ
+# ============================
+# Импорт стандартных библиотек
+import os
+import re
+import json
+import math
+from collections import Counter
+from pathlib import Path
+
+# Импорт аннотаций типов
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Импорт внешних библиотек
+import numpy as np
+
+# Импорт библиотек LangChain
+from langchain_core.documents import Document
+
+# Служебные слова, которые не учитываются при поиске и оценке уверенности
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it of on or that the this to was what when
+where which who why with you your about please tell me explain describe
+и в во на не что как это по с со к ко из у о об от для за ли же то а но или мне расскажи объясни
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Description:
+        Разбивает текст на нормализованные термины.
+
+    Args:
+        text: Текст.
+
+    Returns:
+        Список терминов в нижнем регистре.
+
+    Examples:
+        >>> tokenize("Hello, World!")
+        ['hello', 'world']
+    """
+    return re.findall(r'\w+', text.lower())
+
+
+class BM25Index:
+    """
+    Description:
+        Инвертированный индекс BM25 по документам файла. Строится при загрузке файла
+        (документы можно добавлять по мере чтения) и сохраняется рядом с FAISS индексом.
+        Поиск выполняется локально, без вызова модели эмбеддингов.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Description:
+            Инициализация пустого индекса.
+
+        Args:
+            k1: Параметр насыщения частоты термина.
+            b: Параметр нормализации длины документа.
+        """
+        self.k1 = k1
+        self.b = b
+        self.documents: List[Document] = []
+        self.lengths: List[int] = []
+        # Термин -> (номера документов, частоты термина в них)
+        self.postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._lengths_array = None
+
+    # ============================
+    # ПОСТРОЕНИЕ ИНДЕКСА
+    # ============================
+    def add_documents(self, docs: Iterable[Document]) -> None:
+        """
+        Description:
+            Добавляет документы в индекс.
+
+        Args:
+            docs: Документы (например, страницы PDF).
+        """
+        for doc in docs:
+            if not doc.page_content.strip():
+                continue
+            doc_id = len(self.documents)
+            terms = Counter(tokenize(doc.page_content))
+            self.documents.append(doc)
+            self.lengths.append(sum(terms.values()))
+            for term, frequency in terms.items():
+                ids, frequencies = self.postings.setdefault(term, ([], []))
+                ids.append(doc_id)
+                frequencies.append(frequency)
+        self._lengths_array = None
+
+    def idf(self, term: str) -> float:
+        """
+        Description:
+            Вычисляет обратную документную частоту термина.
+
+        Args:
+            term: Термин.
+
+        Returns:
+            IDF термина; для отсутствующих в индексе терминов — максимально возможное значение.
+        """
+        document_frequency = len(self.postings.get(term, ((), ()))[0])
+        total = len(self.documents)
+        return math.log(1 + (total - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    # ============================
+    # ПОИСК
+    # ============================
+    def scores(self, query: str) -> np.ndarray:
+        """
+        Description:
+            Вычисляет оценки BM25 запроса для всех документов индекса.
+            Обрабатываются только списки документов терминов запроса.
+
+        Args:
+            query: Запрос пользователя.
+
+        Returns:
+            Массив оценок в порядке документов.
+        """
+        if self._lengths_array is None:
+            self._lengths_array = np.asarray(self.lengths, dtype=np.float32)
+        lengths = self._lengths_array
+        average_length = float(lengths.mean()) if len(lengths) else 1.0
+
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term in set(tokenize(query)) - STOPWORDS:
+            if term not in self.postings:
+                continue
+            ids, frequencies = self.postings[term]
+            ids = np.asarray(ids)
+            frequencies = np.asarray(frequencies, dtype=np.float32)
+            norm = self.k1 * (1 - self.b + self.b * lengths[ids] / max(average_length, 1e-6))
+            scores[ids] += self.idf(term) * frequencies * (self.k1 + 1) / (frequencies + norm)
+        return scores
+
+    def search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        """
+        Description:
+            Возвращает k документов с наибольшей оценкой BM25.
+
+        Args:
+            query: Запрос пользователя.
+            k: Количество документов.
+
+        Returns:
+            Список кортежей (документ, оценка) в порядке убывания оценки; документы без совпадений не возвращаются.
+        """
+        scores = self.scores(query)
+        if not len(scores):
+            return []
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.documents[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def confidence(self, query: str, results: List[Tuple[Document, float]]) -> float:
+        """
+        Description:
+            Оценивает уверенность лексического поиска: доля значимых терминов запроса (взвешенная по IDF),
+            встречающихся в лучшем документе. Термины, отсутствующие в индексе, снижают уверенность,
+            поэтому перефразированные и «смысловые» вопросы уходят в векторный поиск.
+
+        Args:
+            query: Запрос пользователя.
+            results: Результаты search для этого запроса.
+
+        Returns:
+            Уверенность от 0 до 1.
+        """
+        terms = set(tokenize(query)) - STOPWORDS
+        if not results or not terms:
+            return 0.0
+        top_terms = set(tokenize(results[0][0].page_content))
+        weights = {term: self.idf(term) for term in terms}
+        total = sum(weights.values())
+        covered = sum(weight for term, weight in weights.items() if term in top_terms)
+        return covered / total if total else 0.0
+
+    def memory_size(self) -> int:
+        """
+        Description:
+            Оценивает объем памяти индекса (для лимита кэша индексов).
+
+        Returns:
+            Оценка размера в байтах.
+        """
+        texts_size = sum(len(doc.page_content.encode('utf-8')) for doc in self.documents)
+        postings_size = sum(len(ids) for ids, _ in self.postings.values()) * 16
+        return texts_size + postings_size
+
+    # ============================
+    # СОХРАНЕНИЕ И ЗАГРУЗКА
+    # ============================
+    def save(self, path: Path) -> None:
+        """
+        Description:
+            Атомарно сохраняет индекс в JSON файл.
+
+        Args:
+            path: Путь к файлу индекса.
+        """
+        path = Path(path)
+        data: Dict[str, Any] = {
+            'k1': self.k1,
+            'b': self.b,
+            'documents': [{'text': doc.page_content, 'metadata': doc.metadata} for doc in self.documents],
+            'lengths': self.lengths,
+            'postings': self.postings,
+        }
+        tmp_path = path.with_name(path.name + '.tmp')
+        with tmp_path.open('w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        """
+        Description:
+            Загружает индекс из JSON файла.
+
+        Args:
+            path: Путь к файлу индекса.
+
+        Returns:
+            BM25Index: Загруженный индекс.
+
+        Raises:
+            FileNotFoundError: Если файл не найден.
+        """
+        with Path(path).open('r', encoding='utf-8') as file:
+            data = json.load(file)
+        index = cls(k1=data['k1'], b=data['b'])
+        index.documents = [Document(page_content=doc['text'], metadata=doc['metadata']) for doc in data['documents']]
+        index.lengths = data['lengths']
+        index.postings = {term: (ids, frequencies) for term, (ids, frequencies) in data['postings'].items()}
+        return index
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 60) -> List[Document]:
+    """
+    Description:
+        Объединяет несколько ранжированных списков документов методом Reciprocal Rank Fusion:
+        оценка документа — сумма 1 / (k + ранг) по всем спискам.
+
+    Args:
+        rankings: Ранжированные списки документов (например, BM25 и векторный поиск).
+        k: Сглаживающая константа RRF.
+
+    Returns:
+        Объединенный список документов без повторов в порядке убывания оценки.
+    """
+    scores: Dict[Tuple[Any, Any, str], float] = {}
+    documents: Dict[Tuple[Any, Any, str], Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            key = (doc.metadata.get('source'), doc.metadata.get('page'), doc.page_content)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(key, doc)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
@@ -0,0 +1,208 @@
+# back/chunking.py
+# ============================
+# БЛОК ИМПОРТОВ
+# ============================
+# Импорт стандартных библиотек
+import re
+
+# Импорт аннотаций типов
+from typing import Iterable, Iterator, List, NamedTuple, Tuple, Union
+
+# Импорт внутренних библиотек
+from back.config import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNK_MIN_TOKENS
+from back.tokens import count_tokens, tail_tokens, split_tokens
+
+# Разделители для разрезания слишком больших блоков: абзацы, строки, предложения, слова
+SPLIT_SEPARATORS = (r'\n\s*\n', r'\n', r'(?<=[.!?…])\s+', r'\s+')
+
+# Разделитель блоков внутри чанка
+UNIT_SEPARATOR = "\n\n"
+
+# Первая строка страницы, похожая на заголовок раздела («# Title», «Chapter 2», «3.1 Results»)
+HEADING_PATTERN = re.compile(r'^\s*(#{1,6}\s|(chapter|глава|section|раздел)\b|\d+(\.\d+)*\.?\s+[A-ZА-ЯЁ])', re.IGNORECASE)
+
+
+class Unit(NamedTuple):
+    """
+    Description:
+        Структурный блок документа: страница PDF, ячейка ноутбука или фрагмент транскрипции.
+        Блоки не разрезаются, если помещаются в чанк. Заголовок начинает новый чанк,
+        если текущий чанк уже достаточно заполнен.
+    """
+    text: str
+    heading: bool = False
+
+
+def split_text(text: str, max_tokens: int, model: str = 'gpt-4o-mini', level: int = 0) -> List[Tuple[str, int]]:
+    """
+    Description:
+        Разрезает блок, не помещающийся в чанк, на части не длиннее max_tokens.
+        Сначала текст делится по абзацам, затем по строкам, предложениям и словам;
+        если и этого недостаточно, текст режется по токенам.
+
+    Args:
+        text: Текст блока.
+        max_tokens: Максимальное количество токенов в части.
+        model: Имя модели OpenAI, токенизатор которой используется.
+        level: Номер текущего разделителя в SPLIT_SEPARATORS.
+
+    Returns:
+        Список кортежей (часть текста, количество токенов).
+
+    Examples:
+        >>> split_text("First paragraph.\n\nSecond paragraph.", max_tokens=3)
+        [('First paragraph.', 3), ('Second paragraph.', 3)]
+    """
+    if level >= len(SPLIT_SEPARATORS):
+        return [(part, count_tokens(part, model)) for part in split_tokens(text, max_tokens, model)]
+
+    parts: List[Tuple[str, int]] = []
+    for piece in re.split(SPLIT_SEPARATORS[level], text):
+        piece = piece.strip()
+        if not piece:
+            continue
+        tokens = count_tokens(piece, model)
+        if tokens > max_tokens:
+            parts.extend(split_text(piece, max_tokens, model, level + 1))
+        else:
+            parts.append((piece, tokens))
+
+    # Соседние мелкие части объединяются обратно, чтобы не терять связность текста
+    separator = "\n\n" if level == 0 else "\n" if level == 1 else " "
+    merged: List[Tuple[str, int]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for piece, tokens in parts:
+        if current and current_tokens + tokens > max_tokens:
+            merged.append((separator.join(current), current_tokens))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        merged.append((separator.join(current), current_tokens))
+    return merged
+
+
+def iter_chunks(units: Iterable[Union[str, Unit]],
+                max_tokens: int = CHUNK_MAX_TOKENS,
+                overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                min_tokens: int = CHUNK_MIN_TOKENS,
+                model: str = 'gpt-4o-mini') -> Iterator[str]:
+    """
+    Description:
+        Упаковывает структурные блоки документа в чанки заданного размера в токенах.
+        Блоки объединяются целиком, пока помещаются в чанк; слишком большие блоки разрезаются
+        по абзацам, строкам и предложениям. Каждый следующий чанк начинается с окончания
+        предыдущего (перекрытие), кроме чанков, начинающихся с заголовка.
+        Токены каждого блока считаются один раз, строки собираются через join, поэтому время
+        работы линейно по размеру документа. Функция — генератор и не требует загрузки
+        всего документа в память.
+
+    Args:
+        units: Блоки документа (строки или Unit) в порядке следования.
+        max_tokens: Максимальный размер чанка в токенах.
+        overlap_tokens: Размер перекрытия соседних чанков в токенах.
+        min_tokens: Минимальный размер чанка, после которого заголовок начинает новый чанк.
+        model: Имя модели OpenAI, токенизатор которой используется.
+
+    Yields:
+        Текст очередного чанка.
+
+    Examples:
+        >>> list(iter_chunks(["one", "two", "three"], max_tokens=2, overlap_tokens=0))
+        ['one\n\ntwo', 'three']
+    """
+    overlap_tokens = max(0, min(overlap_tokens, max_tokens // 2))
+    parts: List[str] = []
+    part_tokens: List[int] = []
+    total = 0
+    # Есть ли в текущем чанке новый текст помимо перекрытия с предыдущим
+    fresh = False
+
+    def overlap() -> Tuple[List[str], List[int]]:
+        # Окончание чанка: последние части целиком, а если последняя часть больше перекрытия — ее хвост
+        tail_parts, tail_counts, budget = [], [], overlap_tokens
+        for part, tokens in zip(reversed(parts), reversed(part_tokens)):
+            if tokens > budget:
+                if not tail_parts and budget > 0:
+                    tail = tail_tokens(part, budget, model)
+                    tail_parts.append(tail)
+                    tail_counts.append(count_tokens(tail, model))
+                break
+            tail_parts.append(part)
+            tail_counts.append(tokens)
+            budget -= tokens
+        return tail_parts[::-1], tail_counts[::-1]
+
+    for unit in units:
+        if isinstance(unit, str):
+            unit = Unit(unit)
+        text = unit.text.strip()
+        if not text:
+            continue
+
+        tokens = count_tokens(text, model)
+        pieces = [(text, tokens)] if tokens <= max_tokens else split_text(text, max_tokens - overlap_tokens, model)
+
+        if unit.heading and fresh and total >= min_tokens:
+            # Новый раздел начинается с нового чанка без перекрытия с предыдущим разделом
+            yield UNIT_SEPARATOR.join(parts)
+            parts, part_tokens, total, fresh = [], [], 0, False
+
+        for piece, piece_tokens in pieces:
+            if total + piece_tokens > max_tokens:
+                if fresh:
+                    yield UNIT_SEPARATOR.join(parts)
+                    parts, part_tokens = overlap()
+                    total, fresh = sum(part_tokens), False
+                if total + piece_tokens > max_tokens:
+                    # Перекрытие не помещается вместе с крупным блоком — блок важнее
+                    parts, part_tokens, total = [], [], 0
+            parts.append(piece)
+            part_tokens.append(piece_tokens)
+            total += piece_tokens
+            fresh = True
+
+    if fresh:
+        yield UNIT_SEPARATOR.join(parts)
+
+
+def notebook_units(cells: Iterable[dict]) -> Iterator[Unit]:
+    """
+    Description:
+        Преобразует ячейки Jupyter Notebook в структурные блоки. Код оформляется блоком
+        Markdown, ячейки Markdown, начинающиеся с заголовка, отмечаются как заголовки.
+
+    Args:
+        cells: Ячейки ноутбука (nbformat) с полями 'cell_type' и 'source'.
+
+    Yields:
+        Unit для каждой непустой ячейки кода или Markdown.
+    """
+    for cell in cells:
+        source = cell.get('source', '')
+        if not source.strip():
+            continue
+        if cell.get('cell_type') == 'code':
+            yield Unit(f"```python\n{source}\n```")
+        elif cell.get('cell_type') == 'markdown':
+            yield Unit(source, heading=source.lstrip().startswith('#'))
+
+
+def page_units(pages: Iterable[str]) -> Iterator[Unit]:
+    """
+    Description:
+        Преобразует страницы документа в структурные блоки.
+        Страница, начинающаяся с заголовка раздела (например, «1. Introduction» или «Chapter 2»),
+        отмечается как заголовок.
+
+    Args:
+        pages: Тексты страниц.
+
+    Yields:
+        Unit для каждой непустой страницы.
+    """
+    for page in pages:
+        first_line = page.lstrip().split("\n", 1)[0]
+        yield Unit(page, heading=bool(HEADING_PATTERN.match(first_line)))
+
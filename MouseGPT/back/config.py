@@ -0,0 +1,200 @@
+# back/config.py
+# ============================
+# БЛОК ИМПОРТОВ
+# ============================
+# Импорт стандартных библиотек
+import os
+
+# Импорт библиотеки для загрузки переменных окружения из файла .env
+from dotenv import load_dotenv
+
+# ============================
+# БЛОК НАСТРОЕК И ИНИЦИАЛИЗАЦИИ
+# ============================
+# Загрузка переменных окружения из файла .env
+load_dotenv()
+
+# ============================
+# НАСТРОЙКИ ОБРАБОТКИ МЕДИА
+# ============================
+# Путь к исполняемым файлам ffmpeg / ffprobe
+FFMPEG_BINARY  = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+FFPROBE_BINARY = os.getenv('FFPROBE_BINARY', 'ffprobe')
+
+# Параметры PCM потока, который читается из ffmpeg (моно, 16 кГц, 16 бит — формат, достаточный для Whisper)
+MEDIA_SAMPLE_RATE = int(os.getenv('MEDIA_SAMPLE_RATE', 16000))
+MEDIA_CHANNELS    = 1
+
+# Максимальная длительность одного чанка медиа в секундах (дополнительно ограничивается WHISPER_MAX_UPLOAD_MB)
+MEDIA_CHUNK_DURATION_S = int(os.getenv('MEDIA_CHUNK_DURATION_S', 60 * 20))
+
+# Битрейт, с которым каждый чанк кодируется в mp3 перед отправкой на распознавание
+MEDIA_CHUNK_BITRATE = os.getenv('MEDIA_CHUNK_BITRATE', '64k')
+
+# Лимит размера загружаемого файла в Whisper API (в мегабайтах)
+WHISPER_MAX_UPLOAD_MB = float(os.getenv('WHISPER_MAX_UPLOAD_MB', 25))
+
+# Окно перед границей чанка, в котором ищется пауза для разреза (в секундах, 0 — резать ровно по границе)
+MEDIA_SILENCE_SEARCH_S = float(os.getenv('MEDIA_SILENCE_SEARCH_S', 20))
+
+# Длина кадра для расчёта RMS энергии (в миллисекундах)
+MEDIA_SILENCE_FRAME_MS = int(os.getenv('MEDIA_SILENCE_FRAME_MS', 30))
+
+# Порог тишины в dBFS: из кадров тише порога выбирается ближайший к границе чанка
+MEDIA_SILENCE_THRESHOLD_DB = float(os.getenv('MEDIA_SILENCE_THRESHOLD_DB', -40))
+
+# Перекрытие соседних чанков (в секундах), чтобы слова на границе не терялись
+MEDIA_CHUNK_OVERLAP_S = float(os.getenv('MEDIA_CHUNK_OVERLAP_S', 1.0))
+
+# ============================
+# НАСТРОЙКИ РАСПОЗНАВАНИЯ РЕЧИ
+# ============================
+# Бэкенд распознавания: 'openai' (Whisper API) или 'faster_whisper' (локальная модель CTranslate2 на CPU)
+TRANSCRIBE_BACKEND = os.getenv('TRANSCRIBE_BACKEND', 'openai')
+
+# Локальная модель faster-whisper: размер (tiny, base, small, medium, large-v3) или путь к модели
+WHISPER_LOCAL_MODEL = os.getenv('WHISPER_LOCAL_MODEL', 'small')
+
+# Устройство и тип вычислений локальной модели (int8 — квантизация весов для CPU)
+WHISPER_LOCAL_DEVICE       = os.getenv('WHISPER_LOCAL_DEVICE', 'cpu')
+WHISPER_LOCAL_COMPUTE_TYPE = os.getenv('WHISPER_LOCAL_COMPUTE_TYPE', 'int8')
+
+# Количество потоков CPU для локальной модели (0 — по умолчанию CTranslate2)
+WHISPER_LOCAL_CPU_THREADS = int(os.getenv('WHISPER_LOCAL_CPU_THREADS', 0))
+
+# Количество речевых сегментов, распознаваемых одним пакетом
+WHISPER_LOCAL_BATCH_SIZE = int(os.getenv('WHISPER_LOCAL_BATCH_SIZE', 8))
+
+# Фильтрация тишины (VAD) перед распознаванием локальной моделью
+WHISPER_VAD_FILTER = os.getenv('WHISPER_VAD_FILTER', 'true').lower() in ('1', 'true', 'yes')
+
+# Язык речи (например, 'ru') или пусто для автоматического определения
+WHISPER_LANGUAGE = os.getenv('WHISPER_LANGUAGE') or None
+
+# ============================
+# НАСТРОЙКИ RAG
+# ============================
+# Максимальное количество FAISS индексов, одновременно удерживаемых в памяти процесса
+FAISS_CACHE_MAX_ENTRIES = int(os.getenv('FAISS_CACHE_MAX_ENTRIES', 8))
+
+# Ограничение суммарного размера закэшированных FAISS индексов (в мегабайтах)
+FAISS_CACHE_MAX_MB = float(os.getenv('FAISS_CACHE_MAX_MB', 512))
+
+# ============================
+# НАСТРОЙКИ ЭМБЕДДИНГОВ
+# ============================
+# Источник эмбеддингов: 'openai' — OpenAI API, 'hash' — детерминированная локальная заглушка (для тестов)
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'openai')
+
+# Модель эмбеддингов OpenAI
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'text-embedding-ada-002')
+
+# Размерность эмбеддингов локальной заглушки
+HASH_EMBEDDING_DIM = int(os.getenv('HASH_EMBEDDING_DIM', 256))
+
+# Количество текстов в одном запросе к API эмбеддингов и число параллельных запросов при индексации
+EMBEDDING_BATCH_SIZE  = int(os.getenv('EMBEDDING_BATCH_SIZE', 256))
+EMBEDDING_CONCURRENCY = int(os.getenv('EMBEDDING_CONCURRENCY', 4))
+
+# Путь к постоянному кэшу эмбеддингов (пустая строка отключает кэш)
+EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', 'temp/cache/embeddings.sqlite3')
+
+# Модель, которая генерирует ответы по документам
+RAG_LLM_MODEL = os.getenv('RAG_LLM_MODEL', 'gpt-4o-mini')
+
+# Стратегия генерации ответа: 'stuff' (один вызов LLM), 'refine' (последовательное уточнение),
+# 'map_reduce' (параллельная обработка документов и объединение)
+RAG_STRATEGY = os.getenv('RAG_STRATEGY', 'stuff')
+
+# Сколько документов извлекается из индекса и сколько остается после переранжирования
+RAG_FETCH_K = int(os.getenv('RAG_FETCH_K', 8))
+RAG_TOP_N   = int(os.getenv('RAG_TOP_N', 4))
+
+# Бюджет токенов на документы в промпте стратегии 'stuff'
+RAG_TOKEN_BUDGET = int(os.getenv('RAG_TOKEN_BUDGET', 3000))
+
+# Количество параллельных вызовов LLM на шаге map стратегии 'map_reduce'
+RAG_MAP_CONCURRENCY = int(os.getenv('RAG_MAP_CONCURRENCY', 4))
+
+# Вес лексической оценки при переранжировании (1 — только лексическая, 0 — только векторная)
+RAG_RERANK_LEXICAL_WEIGHT = float(os.getenv('RAG_RERANK_LEXICAL_WEIGHT', 0.5))
+
+# Сглаживающая константа Reciprocal Rank Fusion при объединении BM25 и векторного поиска
+RAG_RRF_K = int(os.getenv('RAG_RRF_K', 60))
+
+# Уверенность BM25 (доля терминов запроса в лучшем документе), начиная с которой ответ строится
+# только по лексическому поиску без запроса эмбеддинга; значение больше 1 отключает быстрый режим
+RAG_BM25_FAST_CONFIDENCE = float(os.getenv('RAG_BM25_FAST_CONFIDENCE', 0.9))
+
+# ============================
+# НАСТРОЙКИ ФОНОВЫХ ЗАДАЧ
+# ============================
+# Количество файлов, обрабатываемых одновременно
+JOB_MAX_WORKERS = int(os.getenv('JOB_MAX_WORKERS', 2))
+
+# Максимальное количество задач в очереди и в работе (сверх лимита новые загрузки отклоняются)
+JOB_MAX_PENDING = int(os.getenv('JOB_MAX_PENDING', 16))
+
+# Время хранения завершенных задач в секундах (после него удаляются задача, ее файл состояния и директория загрузки)
+JOB_RETENTION_S = float(os.getenv('JOB_RETENTION_S', 24 * 60 * 60))
+
+# Поддиректория рабочей директории, в которой хранится состояние задач
+JOBS_DIRECTORY = os.getenv('JOBS_DIRECTORY', 'jobs')
+
+# ============================
+# НАСТРОЙКИ КЭША ОТВЕТОВ LLM
+# ============================
+# Путь к постоянному кэшу ответов LLM при суммаризации (пустая строка отключает кэш)
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', 'temp/cache/llm_responses.sqlite3')
+
+# Максимальный размер кэша ответов; при превышении вытесняются давно не использованные ответы
+LLM_CACHE_MAX_MB = float(os.getenv('LLM_CACHE_MAX_MB', 64))
+
+# Запросы с температурой выше порога не кэшируются (ответ недетерминирован);
+# большое значение (например, 2) включает кэш для любых температур
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv('LLM_CACHE_MAX_TEMPERATURE', 0.2))
+
+# ============================
+# НАСТРОЙКИ ЧАНКОВ
+# ============================
+# Целевой размер чанка для суммаризации в токенах
+CHUNK_MAX_TOKENS = int(os.getenv('CHUNK_MAX_TOKENS', 2000))
+
+# Перекрытие соседних чанков в токенах (контекст предыдущего чанка)
+CHUNK_OVERLAP_TOKENS = int(os.getenv('CHUNK_OVERLAP_TOKENS', 100))
+
+# Минимальный размер чанка, после которого заголовок начинает новый чанк
+CHUNK_MIN_TOKENS = int(os.getenv('CHUNK_MIN_TOKENS', 500))
+
+# ============================
+# НАСТРОЙКИ ЗАГРУЗКИ PDF
+# ============================
+# Количество процессов для извлечения текста страниц (0 — в процессе приложения)
+PDF_EXTRACT_WORKERS = int(os.getenv('PDF_EXTRACT_WORKERS', 0))
+
+# Количество страниц в одном задании пула процессов
+PDF_EXTRACT_BATCH_PAGES = int(os.getenv('PDF_EXTRACT_BATCH_PAGES', 8))
+
+# Количество страниц в одном пакете векторизации при инкрементальном построении FAISS индекса
+FAISS_ADD_BATCH_SIZE = int(os.getenv('FAISS_ADD_BATCH_SIZE', 32))
+
+# ============================
+# НАСТРОЙКИ ВЕБ-СЕРВЕРА
+# ============================
+# Ключ подписи cookie сессий Flask; без него генерируется случайный ключ (сессии сбрасываются при перезапуске)
+SECRET_KEY = os.getenv('SECRET_KEY')
+
+# Асинхронный режим Socket.IO: 'eventlet', 'gevent', 'threading' или пусто для автоматического выбора
+SOCKETIO_ASYNC_MODE = os.getenv('SOCKETIO_ASYNC_MODE') or None
+
+# Поддиректория рабочей директории с отдельными пространствами файлов для каждой сессии
+WORKSPACES_DIRECTORY = os.getenv('WORKSPACES_DIRECTORY', 'workspaces')
+
+# Время хранения загрузок в рабочих пространствах в секундах (загрузки без задачи и пустые пространства удаляются)
+WORKSPACE_TTL_S = float(os.getenv('WORKSPACE_TTL_S', 24 * 60 * 60))
+
+# Интервал проверки рабочих пространств в секундах
+WORKSPACE_SWEEP_INTERVAL_S = float(os.getenv('WORKSPACE_SWEEP_INTERVAL_S', 60 * 60))
+
+# Сколько последних задач хранится в сессии пользователя
+SESSION_MAX_JOBS = int(os.getenv('SESSION_MAX_JOBS', 20))
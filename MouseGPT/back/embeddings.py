@@ -0,0 +1,327 @@
+# back/embeddings.py
+# ============================
+# БЛОК ИМПОРТОВ
+# ============================
+# Импорт стандартных библиотек
+import re
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Импорт аннотаций типов
+from typing import Dict, List, Optional
+
+# Импорт внешних библиотек
+import numpy as np
+
+# Импорт библиотек LangChain
+from langchain_core.embeddings import Embeddings
+
+# Импорт внутренних библиотек
+from back.config import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL,
+    HASH_EMBEDDING_DIM,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_CONCURRENCY,
+    EMBEDDING_CACHE_PATH,
+)
+
+# Максимальное количество параметров в одном SQL запросе к кэшу
+SQL_BATCH_SIZE = 500
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Description:
+        Детерминированная локальная заглушка эмбеддингов для тестов и бенчмарков.
+        Каждое слово хэшируется в одну из координат вектора, вектор нормализуется по L2.
+        Тексты с общими словами получают близкие векторы, сетевые вызовы не выполняются.
+    """
+
+    def __init__(self, dim: int = HASH_EMBEDDING_DIM):
+        """
+        Description:
+            Инициализация заглушки.
+
+        Args:
+            dim: Размерность эмбеддингов.
+        """
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        """
+        Description:
+            Строит эмбеддинг одного текста.
+
+        Args:
+            text: Текст для векторизации.
+
+        Returns:
+            Нормализованный вектор.
+        """
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in re.findall(r'\w+', text.lower()):
+            digest = hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest()
+            value = int.from_bytes(digest, 'little')
+            vector[value % self.dim] += 1.0 if value & (1 << 63) else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Description:
+            Векторизует список документов.
+
+        Args:
+            texts: Тексты документов.
+
+        Returns:
+            Эмбеддинги в порядке входных текстов.
+        """
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Description:
+            Векторизует запрос.
+
+        Args:
+            text: Текст запроса.
+
+        Returns:
+            Эмбеддинг запроса.
+        """
+        return self._embed(text)
+
+
+class EmbeddingCache:
+    """
+    Description:
+        Постоянный кэш эмбеддингов в SQLite. Ключом служит хэш текста вместе с именем модели,
+        векторы хранятся как float32 BLOB.
+    """
+
+    def __init__(self, path: str):
+        """
+        Description:
+            Открывает (или создает) базу кэша.
+
+        Args:
+            path: Путь к файлу SQLite.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """
+        Description:
+            Формирует ключ кэша по имени модели и тексту.
+
+        Args:
+            model: Имя модели эмбеддингов.
+            text: Текст.
+
+        Returns:
+            Хэш SHA-256 в шестнадцатеричном виде.
+        """
+        return hashlib.sha256(f"{model}\0{text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """
+        Description:
+            Возвращает закэшированные векторы для набора ключей.
+
+        Args:
+            keys: Ключи кэша.
+
+        Returns:
+            Словарь ключ -> вектор для найденных ключей.
+        """
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for i in range(0, len(keys), SQL_BATCH_SIZE):
+                batch = keys[i:i + SQL_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        """
+        Description:
+            Сохраняет векторы в кэш одной транзакцией.
+
+        Args:
+            items: Словарь ключ -> вектор.
+        """
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Description:
+        Слой эмбеддингов поверх произвольного клиента LangChain: постоянный кэш по хэшу текста
+        и имени модели, пакетные запросы настраиваемого размера и параллельная отправка пакетов
+        при индексации документов.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str,
+                 cache: Optional[EmbeddingCache] = None,
+                 batch_size: int = EMBEDDING_BATCH_SIZE,
+                 max_concurrency: int = EMBEDDING_CONCURRENCY):
+        """
+        Description:
+            Инициализация слоя эмбеддингов.
+
+        Args:
+            embeddings: Клиент эмбеддингов, выполняющий фактическую векторизацию.
+            model_name: Имя модели (входит в ключ кэша).
+            cache: Постоянный кэш или None, чтобы работать без кэша.
+            batch_size: Количество текстов в одном запросе к клиенту.
+            max_concurrency: Количество параллельных запросов при индексации.
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+
+    @staticmethod
+    def _normalize_query(text: str) -> str:
+        """
+        Description:
+            Нормализует запрос, чтобы вопросы, отличающиеся регистром и пробелами, попадали в кэш.
+
+        Args:
+            text: Текст запроса.
+
+        Returns:
+            Нормализованный текст.
+        """
+        return " ".join(text.split()).lower()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Description:
+            Векторизует документы, запрашивая у клиента только отсутствующие в кэше тексты.
+
+        Args:
+            texts: Тексты документов.
+
+        Returns:
+            Эмбеддинги в порядке входных текстов.
+        """
+        keys = [EmbeddingCache.make_key(self.model_name, text) for text in texts]
+        vectors = self.cache.get_many(list(set(keys))) if self.cache else {}
+
+        # Уникальные тексты, которых нет в кэше
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+
+        if missing:
+            missing_keys = list(missing)
+            batches = [missing_keys[i:i + self.batch_size] for i in range(0, len(missing_keys), self.batch_size)]
+
+            def embed_batch(batch_keys: List[str]) -> List[List[float]]:
+                return self.embeddings.embed_documents([missing[key] for key in batch_keys])
+
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_concurrency, len(batches)))) as executor:
+                computed: Dict[str, List[float]] = {}
+                for batch_keys, batch_vectors in zip(batches, executor.map(embed_batch, batches)):
+                    computed.update(zip(batch_keys, batch_vectors))
+
+            if self.cache:
+                self.cache.put_many(computed)
+            vectors.update(computed)
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Description:
+            Векторизует запрос с использованием кэша. Векторизуется нормализованный текст,
+            поэтому вектор не зависит от того, в каком написании запрос пришел первым.
+
+        Args:
+            text: Текст запроса.
+
+        Returns:
+            Эмбеддинг запроса.
+        """
+        normalized = self._normalize_query(text)
+        key = EmbeddingCache.make_key(self.model_name, normalized)
+        if self.cache:
+            cached = self.cache.get_many([key])
+            if key in cached:
+                return cached[key]
+
+        vector = self.embeddings.embed_query(normalized)
+        if self.cache:
+            self.cache.put_many({key: vector})
+        return vector
+
+
+def build_embeddings(backend: str = EMBEDDING_BACKEND, cache_path: str = EMBEDDING_CACHE_PATH) -> CachedEmbeddings:
+    """
+    Description:
+        Создает слой эмбеддингов по настройкам приложения.
+
+    Args:
+        backend: 'openai' или 'hash'.
+        cache_path: Путь к постоянному кэшу (пустая строка отключает кэш).
+
+    Returns:
+        CachedEmbeddings: Слой эмбеддингов.
+
+    Raises:
+        ValueError: Если указан неизвестный backend.
+    """
+    if backend == 'openai':
+        from langchain_openai import OpenAIEmbeddings
+        embeddings, model_name = OpenAIEmbeddings(model=EMBEDDING_MODEL, chunk_size=EMBEDDING_BATCH_SIZE), EMBEDDING_MODEL
+    elif backend == 'hash':
+        embeddings, model_name = HashEmbeddings(), f"hash-{HASH_EMBEDDING_DIM}"
+    else:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+
+    cache = EmbeddingCache(cache_path) if cache_path else None
+    return CachedEmbeddings(embeddings, model_name, cache)
+
+
+# Общий для процесса слой эмбеддингов
+_embeddings: Optional[CachedEmbeddings] = None
+_embeddings_lock = threading.Lock()
+
+
+def get_embeddings() -> CachedEmbeddings:
+    """
+    Description:
+        Возвращает слой эмбеддингов, общий для всего процесса.
+        Клиент создается один раз и переиспользует HTTP соединения между запросами.
+
+    Returns:
+        CachedEmbeddings: Слой эмбеддингов.
+    """
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                _embeddings = build_embeddings()
+    return _embeddings
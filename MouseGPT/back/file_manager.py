@@ -3,18 +3,107 @@
 # БЛОК ИМПОРТОВ
 # ============================
 # Импорт стандартных библиотек
+import os
+import time
+import shutil
 import logging
+import threading
 from pathlib import Path
 
 # Импорт аннотаций типов
-from typing import Any
-
-# Импорт для поиска по векторным представлениям
-import faiss
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 # Импорт библиотек LangChain
 from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
+
+# Импорт внутренних библиотек
+from back.bm25 import BM25Index
+from back.config import WORKSPACES_DIRECTORY
+from back.embeddings import get_embeddings
+from back.index_cache import vector_store_cache
+
+# Количество записей, после которого буфер SummaryWriter сбрасывается на диск
+SUMMARY_FLUSH_EVERY = 8
+
+
+class SummaryWriter:
+    """
+    Description:
+        Потоковая запись документа (например, суммаризации) с атомарной публикацией.
+        Содержимое пишется через один открытый дескриптор во временный файл рядом с итоговым,
+        буфер сбрасывается на диск пакетами. Итоговый файл появляется только после commit()
+        переименованием временного файла, поэтому читатели никогда не видят частично записанный документ.
+        При выходе из блока with с исключением временный файл удаляется.
+    """
+
+    def __init__(self, file_path: Path, flush_every: int = SUMMARY_FLUSH_EVERY):
+        """
+        Description:
+            Открывает временный файл для записи.
+
+        Args:
+            file_path: Путь к итоговому файлу.
+            flush_every: Количество записей, после которого буфер сбрасывается на диск.
+        """
+        self.file_path = Path(file_path)
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.file_path.with_name(f".{self.file_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        self.flush_every = flush_every
+        self._buffer: List[str] = []
+        self._file = self.tmp_path.open("w", encoding='utf-8')
+
+    def write(self, content: str) -> None:
+        """
+        Description:
+            Добавляет содержимое в документ.
+
+        Args:
+            content: Текст для добавления.
+        """
+        self._buffer.append(content)
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Description:
+            Сбрасывает накопленный буфер во временный файл.
+        """
+        if self._buffer:
+            self._file.write("".join(self._buffer))
+            self._buffer.clear()
+            self._file.flush()
+
+    def commit(self) -> None:
+        """
+        Description:
+            Дописывает буфер, синхронизирует файл с диском и атомарно публикует его под итоговым именем.
+        """
+        self.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.tmp_path, self.file_path)
+        logging.debug("Document published to %s", self.file_path)
+
+    def abort(self) -> None:
+        """
+        Description:
+            Закрывает и удаляет временный файл без публикации.
+        """
+        if not self._file.closed:
+            self._file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "SummaryWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            if not self._file.closed:
+                self.commit()
+        else:
+            self.abort()
+
 
 class FileManager:
     """
@@ -36,6 +125,10 @@ class FileManager:
         self.working_directory.mkdir(parents=True, exist_ok=True)
         logging.info("WORKING_DIRECTORY: %s", self.working_directory)
 
+        # Кэш шаблонов промптов: путь -> (mtime файла, содержимое)
+        self._prompts: Dict[Path, Tuple[int, str]] = {}
+        self._prompts_lock = threading.Lock()
+
     def read_document(self, file_name: str) -> str:
         """
         Description:
@@ -64,7 +157,7 @@ class FileManager:
         """
         # Создаем путь к файлу с учетом рабочей директории
         file_path = working_directory / file_name.lstrip('/')
-        logging.info(f"Attempting to read file from path: {file_path}")
+        logging.debug(f"Attempting to read file from path: {file_path}")
 
         try:
             # Открываем файл для чтения
@@ -75,6 +168,154 @@ class FileManager:
             logging.error(f"File {file_name} not found at path: {file_path}")
             return f"File {file_name} not found."
 
+    def workspace(self, workspace_id: str) -> Path:
+        """
+        Description:
+            Возвращает (и создает) отдельное рабочее пространство сессии внутри рабочей директории.
+
+        Args:
+            workspace_id: Идентификатор рабочего пространства (шестнадцатеричная строка).
+
+        Returns:
+            Path: Путь к директории рабочего пространства.
+
+        Raises:
+            ValueError: Если идентификатор содержит недопустимые символы.
+        """
+        if not workspace_id.isalnum():
+            raise ValueError(f"Invalid workspace id: {workspace_id}")
+        path = self.working_directory / WORKSPACES_DIRECTORY / workspace_id
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def remove_upload(self, file_path: str) -> None:
+        """
+        Description:
+            Удаляет директорию загрузки (созданную save_upload) вместе с загруженным файлом
+            и созданными по нему суммаризацией и индексами.
+
+        Args:
+            file_path: Путь к загруженному файлу.
+
+        Raises:
+            ValueError: Если файл находится не в директории загрузки рабочего пространства.
+        """
+        upload_directory = Path(file_path).absolute().parent
+        if upload_directory.parent.parent != self.working_directory / WORKSPACES_DIRECTORY:
+            raise ValueError(f"Not an upload directory: {upload_directory}")
+        shutil.rmtree(upload_directory, ignore_errors=True)
+        logging.info("Upload removed: %s", upload_directory)
+
+    def sweep_workspaces(self, max_age_s: float, keep: Iterable[str] = ()) -> int:
+        """
+        Description:
+            Удаляет директории загрузок, которые не изменялись дольше max_age_s секунд, кроме директорий
+            файлов из keep (файлы хранимых задач), и пустые рабочие пространства того же возраста.
+
+        Args:
+            max_age_s: Время хранения загрузки в секундах.
+            keep: Пути к файлам, директории которых удалять нельзя.
+
+        Returns:
+            int: Количество удаленных директорий загрузок.
+        """
+        root = self.working_directory / WORKSPACES_DIRECTORY
+        if not root.is_dir():
+            return 0
+
+        cutoff = time.time() - max_age_s
+        keep_directories = {Path(path).absolute().parent for path in keep}
+        removed = 0
+        for workspace in root.iterdir():
+            if not workspace.is_dir():
+                continue
+            for upload_directory in workspace.iterdir():
+                if not upload_directory.is_dir() or upload_directory in keep_directories:
+                    continue
+                # Время последнего изменения директории или любого файла в ней (суммаризация, индексы)
+                try:
+                    modified = max([upload_directory.stat().st_mtime] +
+                                   [entry.stat().st_mtime for entry in upload_directory.iterdir()])
+                except OSError:
+                    continue
+                if modified < cutoff:
+                    shutil.rmtree(upload_directory, ignore_errors=True)
+                    removed += 1
+            try:
+                if workspace.stat().st_mtime < cutoff and not any(workspace.iterdir()):
+                    workspace.rmdir()
+            except OSError:
+                # Пространство заняла новая загрузка
+                pass
+        if removed:
+            logging.info("Expired uploads removed: %s", removed)
+        return removed
+
+    def relative_name(self, path: str) -> str:
+        """
+        Description:
+            Возвращает путь относительно рабочей директории (в таком виде имена файлов передаются
+            остальным методам менеджера).
+
+        Args:
+            path: Абсолютный путь внутри рабочей директории.
+
+        Returns:
+            str: Относительный путь ('' для самой рабочей директории).
+
+        Raises:
+            ValueError: Если путь находится вне рабочей директории.
+        """
+        relative = Path(path).absolute().relative_to(self.working_directory)
+        return '' if str(relative) == '.' else str(relative)
+
+    def read_prompt(self, file_name: str) -> str:
+        """
+        Description:
+            Возвращает шаблон промпта из реестра. Файл читается с диска один раз и перечитывается
+            только при изменении времени его модификации, поэтому правка промпта применяется без перезапуска.
+
+        Args:
+            file_name: Имя файла промпта относительно рабочей директории (например, 'prompts/system_prompt.txt').
+
+        Returns:
+            str: Текст промпта.
+
+        Raises:
+            FileNotFoundError: Если файл промпта не найден.
+        """
+        file_path = self.working_directory / file_name.lstrip('/')
+        mtime = file_path.stat().st_mtime_ns
+
+        with self._prompts_lock:
+            cached = self._prompts.get(file_path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+
+        with file_path.open("r", encoding='utf-8') as file:
+            content = file.read()
+        with self._prompts_lock:
+            self._prompts[file_path] = (mtime, content)
+        logging.debug("Prompt template loaded: %s", file_path)
+        return content
+
+    def open_document_writer(self, file_name: str) -> SummaryWriter:
+        """
+        Description:
+            Открывает потоковую запись документа с атомарной публикацией при завершении.
+
+        Args:
+            file_name: Имя итогового файла.
+
+        Returns:
+            SummaryWriter: Объект записи (используется как контекстный менеджер).
+
+        Examples:
+            >>> with file_manager.open_document_writer('report_summary.md') as writer:
+            ...     writer.write('# Summary\n')
+        """
+        return SummaryWriter(self.working_directory / file_name.lstrip('/'))
+
     def write_document(self, content: str, file_name: str) -> str:
         """
         Description:
@@ -165,14 +406,14 @@ class FileManager:
             logging.error(f"Error appending to file {file_name}: {e}")
             return f"Error appending to file {file_name}: {e}"
         
-    def save_faiss_index(self, index: Any, file_name: str) -> str:
+    def save_faiss_index(self, index: FAISS, file_name: str) -> str:
         """
         Description:
-            Сохраняет FAISS индекс в файл.
+            Сохраняет FAISS хранилище (индекс и документы) в директорию.
 
         Args:
-            index: FAISS индекс для сохранения.
-            file_name: Имя файла для сохранения индекса.
+            index: FAISS хранилище LangChain для сохранения.
+            file_name: Имя директории для сохранения индекса.
 
         Returns:
             str: Сообщение о сохранении индекса.
@@ -181,8 +422,8 @@ class FileManager:
             file_path = self.working_directory / file_name.lstrip('/')
             file_path.parent.mkdir(parents=True, exist_ok=True)
             
-            # Сохранение индекса FAISS
-            faiss.write_index(index, str(file_path))
+            # Сохранение индекса FAISS вместе с хранилищем документов
+            index.save_local(str(file_path))
             return f"FAISS index saved to {file_name}"
         except IOError as e:
             logging.error(f"Error saving FAISS index to file {file_name}: {e}")
@@ -191,7 +432,8 @@ class FileManager:
     def load_faiss_index(self, file_name: str) -> Any:
         """
         Description:
-            Загружает FAISS индекс из файла.
+            Загружает FAISS индекс из файла. Загруженные индексы кэшируются в памяти процесса,
+            поэтому повторные запросы к тому же индексу не читают его с диска.
 
         Args:
             file_name: Имя файла для загрузки индекса.
@@ -202,13 +444,67 @@ class FileManager:
         try:
             file_path = self.working_directory / file_name.lstrip('/')
             
-            # Загрузка индекса FAISS
-            embeddings  = OpenAIEmbeddings()
-            faiss_index = FAISS.load_local(file_path, embeddings, allow_dangerous_deserialization=True)
-            return faiss_index
+            # Загрузка индекса FAISS (из кэша, если индекс не изменялся с момента последней загрузки)
+            return vector_store_cache.get(file_path, FileManager._load_faiss_index)
         except FileNotFoundError:
             logging.error(f"FAISS index file {file_name} not found at path: {file_path}")
             return None
         except IOError as e:
             logging.error(f"Error loading FAISS index from file {file_name}: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    @staticmethod
+    def _load_faiss_index(file_path: Path) -> FAISS:
+        """
+        Description:
+            Вспомогательный метод для чтения FAISS индекса с диска.
+
+        Args:
+            file_path: Путь к директории FAISS индекса.
+
+        Returns:
+            FAISS: Загруженное хранилище.
+        """
+        return FAISS.load_local(str(file_path), get_embeddings(), allow_dangerous_deserialization=True)
+
+    def save_bm25_index(self, index: BM25Index, file_name: str) -> str:
+        """
+        Description:
+            Сохраняет BM25 индекс в файл (рядом с FAISS индексом того же документа).
+
+        Args:
+            index: BM25 индекс для сохранения.
+            file_name: Имя файла для сохранения индекса.
+
+        Returns:
+            str: Сообщение о сохранении индекса.
+        """
+        try:
+            file_path = self.working_directory / file_name.lstrip('/')
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            index.save(file_path)
+            return f"BM25 index saved to {file_name}"
+        except IOError as e:
+            logging.error(f"Error saving BM25 index to file {file_name}: {e}")
+            return f"Error saving BM25 index to file {file_name}: {e}"
+
+    def load_bm25_index(self, file_name: str) -> Optional[BM25Index]:
+        """
+        Description:
+            Загружает BM25 индекс из файла. Как и FAISS индексы, загруженные индексы кэшируются в памяти процесса.
+
+        Args:
+            file_name: Имя файла индекса.
+
+        Returns:
+            BM25Index: Загруженный индекс или None, если индекс не найден.
+        """
+        try:
+            file_path = self.working_directory / file_name.lstrip('/')
+            return vector_store_cache.get(file_path, BM25Index.load)
+        except FileNotFoundError:
+            logging.error(f"BM25 index file {file_name} not found at path: {file_path}")
+            return None
+        except (IOError, ValueError) as e:
+            logging.error(f"Error loading BM25 index from file {file_name}: {e}")
+            return None
@@ -0,0 +1,146 @@
+# back/index_cache.py
+# ============================
+# БЛОК ИМПОРТОВ
+# ============================
+# Импорт стандартных библиотек
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# Импорт аннотаций типов
+from typing import Callable, Tuple
+
+# Импорт библиотек LangChain
+from langchain_community.vectorstores import FAISS
+
+# Импорт внутренних библиотек
+from back.config import FAISS_CACHE_MAX_ENTRIES, FAISS_CACHE_MAX_MB
+
+logger = logging.getLogger(__name__)
+
+
+class VectorStoreCache:
+    """
+    Description:
+        Процессный LRU кэш загруженных FAISS хранилищ (и сохраненных рядом с ними BM25 индексов).
+        Ключом служит путь к индексу и время его модификации, поэтому перезаписанный
+        индекс автоматически загружается заново. Размер кэша ограничен количеством
+        записей и суммарным объемом памяти.
+    """
+
+    def __init__(self, max_entries: int = FAISS_CACHE_MAX_ENTRIES, max_mb: float = FAISS_CACHE_MAX_MB):
+        """
+        Description:
+            Инициализация кэша.
+
+        Args:
+            max_entries: Максимальное количество индексов в кэше.
+            max_mb: Максимальный суммарный размер индексов в мегабайтах.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[FAISS, int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cache_key(path: Path) -> Tuple[str, int]:
+        """
+        Description:
+            Формирует ключ кэша по пути к индексу и времени его модификации.
+
+        Args:
+            path: Путь к директории FAISS индекса.
+
+        Returns:
+            Кортеж (путь, mtime в наносекундах).
+
+        Raises:
+            FileNotFoundError: Если индекс не найден.
+        """
+        index_file = path / 'index.faiss' if path.is_dir() else path
+        return str(path.resolve()), index_file.stat().st_mtime_ns
+
+    @staticmethod
+    def _estimate_size(store: FAISS) -> int:
+        """
+        Description:
+            Оценивает объем памяти, занимаемый хранилищем: векторы float32 и тексты документов.
+            Для других индексов (например, BM25) используется их собственная оценка memory_size().
+
+        Args:
+            store: FAISS хранилище LangChain или индекс с методом memory_size().
+
+        Returns:
+            Оценка размера в байтах.
+        """
+        if not isinstance(store, FAISS):
+            return store.memory_size()
+        vectors_size = store.index.ntotal * store.index.d * 4
+        documents = getattr(store.docstore, '_dict', {})
+        texts_size = sum(len(doc.page_content.encode('utf-8')) for doc in documents.values())
+        return vectors_size + texts_size
+
+    def get(self, path: Path, loader: Callable[[Path], FAISS]) -> FAISS:
+        """
+        Description:
+            Возвращает хранилище из кэша или загружает его с помощью loader.
+
+        Args:
+            path: Путь к директории FAISS индекса.
+            loader: Функция загрузки хранилища с диска.
+
+        Returns:
+            FAISS: Загруженное хранилище.
+
+        Raises:
+            FileNotFoundError: Если индекс не найден.
+        """
+        key = self._cache_key(path)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+
+        # Загрузка выполняется вне блокировки, чтобы не задерживать запросы к другим индексам
+        store = loader(path)
+        size = self._estimate_size(store)
+
+        with self._lock:
+            # Удаляем устаревшие версии того же индекса
+            for stale_key in [k for k in self._entries if k[0] == key[0] and k != key]:
+                self._total_bytes -= self._entries.pop(stale_key)[1]
+
+            if key not in self._entries:
+                self._entries[key] = (store, size)
+                self._total_bytes += size
+            self._entries.move_to_end(key)
+            self._evict()
+            return self._entries.get(key, (store, size))[0]
+
+    def _evict(self) -> None:
+        """
+        Description:
+            Вытесняет наименее давно использованные индексы, пока кэш превышает лимиты.
+            Последний добавленный индекс не вытесняется, даже если он один превышает лимит памяти.
+        """
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            evicted_key, (_, size) = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            logger.debug("FAISS index evicted from cache: %s", evicted_key[0])
+
+    def clear(self) -> None:
+        """
+        Description:
+            Очищает кэш.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+
+# Общий для процесса кэш FAISS хранилищ
+vector_store_cache = VectorStoreCache()
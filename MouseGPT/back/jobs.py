@@ -0,0 +1,437 @@
+# back/jobs.py
+# ============================
+# БЛОК ИМПОРТОВ
+# ============================
+# Импорт стандартных библиотек
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Импорт аннотаций типов
+from typing import Any, Callable, Dict, List, Optional
+
+# Импорт внутренних библиотек
+from back.config import JOB_MAX_WORKERS, JOB_MAX_PENDING, JOB_RETENTION_S
+
+logger = logging.getLogger(__name__)
+
+# Состояния задачи
+QUEUED    = 'queued'
+RUNNING   = 'running'
+COMPLETED = 'completed'
+FAILED    = 'failed'
+CANCELLED = 'cancelled'
+
+# Состояния, из которых задача больше не переходит
+FINAL_STATES = (COMPLETED, FAILED, CANCELLED)
+
+# Поля результата задачи, которые отправляются клиенту (остальные поля — имена артефактов на сервере)
+PUBLIC_RESULT_FIELDS = ('final_summary', 'chunks', 'llm_calls')
+
+
+class JobCancelled(Exception):
+    """
+    Description:
+        Исключение, которым обработчик прерывает отмененную задачу.
+    """
+
+
+class JobQueueFull(Exception):
+    """
+    Description:
+        Исключение при превышении лимита задач в очереди.
+    """
+
+
+class JobContext:
+    """
+    Description:
+        Интерфейс, через который обработчик задачи сообщает о прогрессе и проверяет отмену.
+    """
+
+    def __init__(self, manager: "JobManager", job: Dict[str, Any]):
+        """
+        Description:
+            Инициализация контекста задачи.
+
+        Args:
+            manager: Менеджер задач.
+            job: Состояние задачи.
+        """
+        self._manager = manager
+        self.job = job
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        Description:
+            Признак того, что задачу попросили отменить.
+
+        Returns:
+            bool: True, если задача отменена.
+        """
+        return self._manager.is_cancel_requested(self.job['id'])
+
+    def check_cancelled(self) -> None:
+        """
+        Description:
+            Прерывает обработку, если задачу попросили отменить.
+
+        Raises:
+            JobCancelled: Если задача отменена.
+        """
+        if self.cancelled:
+            raise JobCancelled(self.job['id'])
+
+    def progress(self, stage: str, current: int = 0, total: int = 0, message: str = "") -> None:
+        """
+        Description:
+            Сообщает о прогрессе задачи: сохраняет его в состоянии и отправляет событие клиенту.
+
+        Args:
+            stage: Этап обработки (например, 'extract', 'summarize', 'final').
+            current: Номер текущего шага этапа.
+            total: Общее количество шагов этапа.
+            message: Произвольное сообщение для клиента.
+        """
+        self.job['progress'] = {'stage': stage, 'current': current, 'total': total, 'message': message}
+        self._manager.update(self.job, event='job_progress')
+        self.check_cancelled()
+
+
+class JobManager:
+    """
+    Description:
+        Менеджер фоновых задач обработки файлов.
+        Задачи выполняются ограниченным пулом потоков, каждой присваивается идентификатор.
+        Состояние задач сохраняется на локальный диск, поэтому после перезапуска незавершенные
+        задачи автоматически ставятся в очередь повторно. О прогрессе сообщается через колбэк notify
+        (в приложении — события Socket.IO в комнату задачи). Завершенные задачи удаляются
+        через retention_s секунд после последнего обновления вместе с их файлами (колбэк cleanup).
+    """
+
+    def __init__(self, state_directory: Path, runner: Callable[[JobContext], Dict[str, Any]],
+                 notify: Optional[Callable[[str, Dict[str, Any], str], None]] = None,
+                 max_workers: int = JOB_MAX_WORKERS, max_pending: int = JOB_MAX_PENDING,
+                 retention_s: float = JOB_RETENTION_S,
+                 cleanup: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Description:
+            Инициализация менеджера задач.
+
+        Args:
+            state_directory: Директория для хранения состояния задач.
+            runner: Обработчик задачи. Получает JobContext и возвращает результат задачи.
+            notify: Колбэк отправки событий (имя события, данные, идентификатор задачи).
+            max_workers: Количество задач, выполняемых одновременно.
+            max_pending: Максимальное количество задач в очереди и в работе.
+            retention_s: Время хранения завершенных задач в секундах.
+            cleanup: Колбэк удаления файлов задачи (загрузки и созданных по ней артефактов) при удалении задачи.
+        """
+        self.state_directory = Path(state_directory)
+        self.state_directory.mkdir(parents=True, exist_ok=True)
+        self.runner = runner
+        self.notify = notify
+        self.max_pending = max_pending
+        self.retention_s = retention_s
+        self.cleanup = cleanup
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='mousegpt-job')
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    # ============================
+    # ХРАНЕНИЕ СОСТОЯНИЯ
+    # ============================
+    def _state_path(self, job_id: str) -> Path:
+        """
+        Description:
+            Возвращает путь к файлу состояния задачи.
+
+        Args:
+            job_id: Идентификатор задачи.
+
+        Returns:
+            Path: Путь к JSON файлу состояния.
+        """
+        return self.state_directory / f"{job_id}.json"
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        """
+        Description:
+            Атомарно сохраняет состояние задачи на диск (запись во временный файл и переименование).
+
+        Args:
+            job: Состояние задачи.
+        """
+        path = self._state_path(job['id'])
+        tmp_path = path.with_suffix('.json.tmp')
+        with tmp_path.open('w', encoding='utf-8') as file:
+            json.dump(job, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def update(self, job: Dict[str, Any], event: Optional[str] = None) -> None:
+        """
+        Description:
+            Сохраняет изменившееся состояние задачи и отправляет событие клиенту.
+
+        Args:
+            job: Состояние задачи.
+            event: Имя события для клиента или None, чтобы не отправлять событие.
+        """
+        job['updated_at'] = time.time()
+        with self._lock:
+            self._save(job)
+        if event and self.notify:
+            try:
+                self.notify(event, self.public_view(job), job['id'])
+            except Exception as e:
+                logger.error(f"Error sending {event} for job {job['id']}: {e}")
+
+    @staticmethod
+    def public_view(job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Description:
+            Возвращает представление задачи для клиента (без путей на сервере).
+
+        Args:
+            job: Состояние задачи.
+
+        Returns:
+            Словарь с публичными полями задачи.
+        """
+        return {
+            'job_id': job['id'],
+            'kind': job['kind'],
+            'filename': job['filename'],
+            'state': job['state'],
+            'progress': job.get('progress'),
+            'result': {key: value for key, value in (job.get('result') or {}).items() if key in PUBLIC_RESULT_FIELDS},
+            'error': job.get('error'),
+        }
+
+    # ============================
+    # ЖИЗНЕННЫЙ ЦИКЛ ЗАДАЧ
+    # ============================
+    def submit(self, kind: str, file_path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Description:
+            Ставит задачу обработки файла в очередь.
+
+        Args:
+            kind: Тип файла (ключ FILE_TYPES).
+            file_path: Путь к загруженному файлу.
+            params: Дополнительные параметры обработки.
+
+        Returns:
+            Состояние созданной задачи.
+
+        Raises:
+            JobQueueFull: Если превышен лимит задач в очереди.
+        """
+        now = time.time()
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'file_path': str(file_path),
+            'filename': os.path.basename(str(file_path)),
+            'params': params or {},
+            'state': QUEUED,
+            'progress': None,
+            'result': None,
+            'error': None,
+            'cancel_requested': False,
+            'created_at': now,
+            'updated_at': now,
+        }
+        # Проверка лимита и добавление задачи в одной критической секции
+        with self._lock:
+            expired = self._prune_locked()
+            pending = sum(1 for other in self._jobs.values() if other['state'] not in FINAL_STATES)
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"Too many pending jobs: {pending}")
+            self._jobs[job['id']] = job
+        self._remove_files(expired)
+        self.update(job, event='job_progress')
+        self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        """
+        Description:
+            Выполняет задачу в потоке пула.
+
+        Args:
+            job: Состояние задачи.
+        """
+        context = JobContext(self, job)
+        try:
+            context.check_cancelled()
+            job['state'] = RUNNING
+            self.update(job, event='job_progress')
+
+            job['result'] = self.runner(context)
+            job['state'] = COMPLETED
+            self.update(job, event='job_done')
+        except JobCancelled:
+            job['state'] = CANCELLED
+            self.update(job, event='job_done')
+        except Exception as e:
+            logger.exception(f"Job {job['id']} failed")
+            job['state'] = FAILED
+            job['error'] = str(e)
+            self.update(job, event='job_done')
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Description:
+            Возвращает состояние задачи.
+
+        Args:
+            job_id: Идентификатор задачи.
+
+        Returns:
+            Состояние задачи или None, если задача не найдена.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Description:
+            Запрашивает отмену задачи. Задача в очереди отменяется до запуска,
+            выполняющаяся — на ближайшей проверке между чанками. Запрос сохраняется в состоянии задачи,
+            поэтому после перезапуска задача не возобновляется.
+
+        Args:
+            job_id: Идентификатор задачи.
+
+        Returns:
+            bool: True, если запрос на отмену принят.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job['state'] in FINAL_STATES:
+                return False
+            job['cancel_requested'] = True
+        self.update(job)
+        return True
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        """
+        Description:
+            Проверяет, запрошена ли отмена задачи.
+
+        Args:
+            job_id: Идентификатор задачи.
+
+        Returns:
+            bool: True, если отмена запрошена.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return bool(job and job.get('cancel_requested'))
+
+    def recover(self) -> List[str]:
+        """
+        Description:
+            Загружает состояние задач с диска после перезапуска. Незавершенные задачи,
+            исходный файл которых сохранился, повторно ставятся в очередь, остальные помечаются как ошибочные.
+            Задачи, отмену которых запросили до перезапуска, помечаются как отмененные.
+            Завершенные задачи старше retention_s удаляются.
+
+        Returns:
+            Список идентификаторов задач, поставленных в очередь повторно.
+        """
+        resumed = []
+        for path in sorted(self.state_directory.glob('*.json')):
+            try:
+                with path.open('r', encoding='utf-8') as file:
+                    job = json.load(file)
+            except (OSError, ValueError) as e:
+                logger.error(f"Error loading job state {path}: {e}")
+                continue
+
+            with self._lock:
+                self._jobs[job['id']] = job
+
+            if job['state'] in FINAL_STATES:
+                continue
+            if job.get('cancel_requested'):
+                job['state'] = CANCELLED
+                self.update(job)
+            elif os.path.exists(job['file_path']):
+                job['state'] = QUEUED
+                self.update(job)
+                self._executor.submit(self._run, job)
+                resumed.append(job['id'])
+            else:
+                job['state'] = FAILED
+                job['error'] = 'Source file was lost during restart'
+                self.update(job)
+
+        with self._lock:
+            expired = self._prune_locked()
+        self._remove_files(expired)
+
+        if resumed:
+            logger.info(f"Resumed {len(resumed)} unfinished jobs: {resumed}")
+        return resumed
+
+    def _prune_locked(self) -> List[Dict[str, Any]]:
+        """
+        Description:
+            Удаляет завершенные задачи, не обновлявшиеся дольше retention_s, вместе с файлами состояния.
+            Вызывается под self._lock; файлы задач удаляются после выхода из блокировки (_remove_files).
+
+        Returns:
+            Список удаленных задач.
+        """
+        cutoff = time.time() - self.retention_s
+        expired = [job for job in self._jobs.values()
+                   if job['state'] in FINAL_STATES and job.get('updated_at', 0) < cutoff]
+        for job in expired:
+            del self._jobs[job['id']]
+            self._state_path(job['id']).unlink(missing_ok=True)
+        return expired
+
+    def _remove_files(self, jobs: List[Dict[str, Any]]) -> None:
+        """
+        Description:
+            Удаляет файлы удаленных задач через колбэк cleanup: после удаления задачи на них ничто не ссылается.
+
+        Args:
+            jobs: Удаленные задачи.
+        """
+        if not self.cleanup:
+            return
+        for job in jobs:
+            try:
+                self.cleanup(job)
+            except Exception as e:
+                logger.error(f"Error removing files of job {job['id']}: {e}")
+
+    def file_paths(self) -> List[str]:
+        """
+        Description:
+            Возвращает пути к загруженным файлам всех хранимых задач (их файлы еще могут понадобиться).
+
+        Returns:
+            Список путей к файлам задач.
+        """
+        with self._lock:
+            return [job['file_path'] for job in self._jobs.values()]
+
+    def shutdown(self, wait: bool = False) -> None:
+        """
+        Description:
+            Останавливает пул потоков.
+
+        Args:
+            wait: Ждать ли завершения выполняющихся задач.
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=True)
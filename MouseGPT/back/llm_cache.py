@@ -0,0 +1,181 @@
+# back/llm_cache.py
+# ============================
+# БЛОК ИМПОРТОВ
+# ============================
+# Импорт стандартных библиотек
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+# Импорт аннотаций типов
+from typing import Any, Dict, List, Optional
+
+# Импорт внутренних библиотек
+from back.config import LLM_CACHE_PATH, LLM_CACHE_MAX_MB, LLM_CACHE_MAX_TEMPERATURE
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """
+    Description:
+        Постоянный кэш ответов LLM в SQLite. Ключ — хэш модели, системного промпта, сообщений
+        и параметров генерации. Размер кэша ограничен: при превышении лимита вытесняются
+        ответы, к которым дольше всего не обращались (LRU).
+        Запросы с температурой выше max_temperature не кэшируются.
+    """
+
+    def __init__(self, path: str, max_bytes: int, max_temperature: float = LLM_CACHE_MAX_TEMPERATURE):
+        """
+        Description:
+            Открывает (или создает) базу кэша.
+
+        Args:
+            path: Путь к файлу SQLite.
+            max_bytes: Максимальный суммарный размер ответов в байтах.
+            max_temperature: Максимальная температура, при которой ответ кэшируется.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_temperature = max_temperature
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, messages: List[Dict[str, Any]], params: Dict[str, Any]) -> str:
+        """
+        Description:
+            Формирует ключ кэша запроса.
+
+        Args:
+            model: Имя модели.
+            system_prompt: Системный промпт.
+            messages: Сообщения диалога (без системного промпта).
+            params: Параметры генерации (temperature, top_p, n и т.п.).
+
+        Returns:
+            Хэш SHA-256 в шестнадцатеричном виде.
+        """
+        system_hash = hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()
+        messages_hash = hashlib.sha256(
+            json.dumps(messages, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        payload = json.dumps([model, system_hash, messages_hash, params], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def cacheable(self, params: Dict[str, Any]) -> bool:
+        """
+        Description:
+            Проверяет, детерминирован ли запрос настолько, чтобы его ответ можно было переиспользовать.
+
+        Args:
+            params: Параметры генерации.
+
+        Returns:
+            bool: True, если температура не превышает порог.
+        """
+        return params.get('temperature', 1.0) <= self.max_temperature
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Description:
+            Возвращает закэшированный ответ и отмечает обращение к нему.
+
+        Args:
+            key: Ключ кэша.
+
+        Returns:
+            Ответ или None, если ключа нет в кэше.
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        """
+        Description:
+            Сохраняет ответ и вытесняет давно не использованные ответы при превышении лимита размера.
+
+        Args:
+            key: Ключ кэша.
+            response: Ответ модели.
+        """
+        size = len(response.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock, self._conn:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time())
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """
+        Description:
+            Удаляет самые давно использованные ответы, пока размер кэша не станет меньше лимита.
+            Вызывается под блокировкой внутри транзакции.
+        """
+        removed, freed = [], 0
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if self._total_bytes - freed <= self.max_bytes:
+                break
+            removed.append((key,))
+            freed += size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", removed)
+        self._total_bytes -= freed
+        logger.debug(f"LLM response cache evicted {len(removed)} entries ({freed} bytes)")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Description:
+            Возвращает статистику кэша.
+
+        Returns:
+            Словарь с количеством попаданий, промахов и размером кэша в байтах.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'bytes': self._total_bytes}
+
+
+# Общий для процесса кэш ответов
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    Description:
+        Возвращает кэш ответов LLM, общий для всего процесса.
+
+    Returns:
+        LLMResponseCache или None, если кэш отключен (пустой LLM_CACHE_PATH).
+    """
+    global _llm_cache
+    if _llm_cache is None and LLM_CACHE_PATH:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMResponseCache(LLM_CACHE_PATH, int(LLM_CACHE_MAX_MB * 1024 * 1024))
+    return _llm_cache
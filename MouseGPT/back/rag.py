@@ -0,0 +1,588 @@
+# back/rag.py
+# ============================
+# БЛОК ИМПОРТОВ
+# ============================
+# Импорт стандартных библиотек
+import os
+import math
+import time
+import logging
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+
+# Импорт аннотаций типов
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Импорт внешних библиотек
+import numpy as np
+
+# Импорт библиотек LangChain
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import HumanMessage
+from langchain_community.vectorstores import FAISS
+
+# Импорт внутренних библиотек
+from back.config import (
+    RAG_STRATEGY,
+    RAG_FETCH_K,
+    RAG_TOP_N,
+    RAG_TOKEN_BUDGET,
+    RAG_MAP_CONCURRENCY,
+    RAG_RERANK_LEXICAL_WEIGHT,
+    RAG_RRF_K,
+    RAG_BM25_FAST_CONFIDENCE,
+)
+from back.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+from back.tokens import count_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+# ============================
+# БЛОК ПРОМПТОВ
+# ============================
+STUFF_PROMPT = (
+    "Use the following pieces of context to answer the question at the end. "
+    "If you don't know the answer, just say that you don't know, don't try to make up an answer.\n\n"
+    "{context}\n\nQuestion: {question}\nHelpful Answer:"
+)
+
+REFINE_INITIAL_PROMPT = (
+    "Context information is below.\n---------------------\n{context}\n---------------------\n"
+    "Given the context information and not prior knowledge, answer the question: {question}\n"
+)
+
+REFINE_PROMPT = (
+    "The original question is as follows: {question}\n"
+    "We have provided an existing answer: {existing_answer}\n"
+    "We have the opportunity to refine the existing answer (only if needed) with some more context below.\n"
+    "------------\n{context}\n------------\n"
+    "Given the new context, refine the original answer to better answer the question. "
+    "If the context isn't useful, return the original answer."
+)
+
+MAP_PROMPT = (
+    "Use the following portion of a long document to see if any of the text is relevant to answer the question. "
+    "Return any relevant text verbatim.\n{context}\nQuestion: {question}\nRelevant text, if any:"
+)
+
+REDUCE_PROMPT = (
+    "Given the following extracted parts of a long document and a question, create a final answer. "
+    "If you don't know the answer, just say that you don't know. Don't try to make up an answer.\n\n"
+    "QUESTION: {question}\n=========\n{summaries}\n=========\nFINAL ANSWER:"
+)
+
+# Доступные стратегии генерации ответа
+STRATEGIES = ('stuff', 'refine', 'map_reduce')
+
+
+@dataclass
+class RAGMetrics:
+    """
+    Description:
+        Метрики одного ответа по документам.
+    """
+    strategy: str
+    retrieval_mode: str = 'vector'
+    documents: int = 0
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    retrieval_s: float = 0.0
+    rerank_s: float = 0.0
+    generation_s: float = 0.0
+    first_token_s: float = 0.0
+    total_s: float = 0.0
+
+
+def source_pages(docs: List[Document]) -> List[Dict[str, Any]]:
+    """
+    Description:
+        Возвращает список источников ответа: имя файла и номер страницы (с единицы) без повторов.
+
+    Args:
+        docs: Документы, использованные для ответа.
+
+    Returns:
+        Список словарей {'source': ..., 'page': ...} в порядке релевантности.
+
+    Examples:
+        >>> source_pages([Document(page_content="...", metadata={"source": "/tmp/a.pdf", "page": 0})])
+        [{'source': 'a.pdf', 'page': 1}]
+    """
+    sources, seen = [], set()
+    for doc in docs:
+        source = os.path.basename(str(doc.metadata.get('source', '')))
+        page = doc.metadata.get('page')
+        page = int(page) + 1 if page is not None else None
+        if (source, page) not in seen:
+            seen.add((source, page))
+            sources.append({'source': source, 'page': page})
+    return sources
+
+
+class Reranker:
+    """
+    Description:
+        Локальный переранжировщик найденных документов. Комбинирует лексическую оценку
+        (BM25 по набору кандидатов) и косинусную близость эмбеддингов запроса и документов.
+        Эмбеддинги документов берутся из кэша, заполненного при индексации, поэтому
+        векторная оценка не требует дополнительных сетевых вызовов.
+    """
+
+    def __init__(self, embeddings: Optional[Embeddings] = None,
+                 lexical_weight: float = RAG_RERANK_LEXICAL_WEIGHT,
+                 k1: float = 1.5, b: float = 0.75):
+        """
+        Description:
+            Инициализация переранжировщика.
+
+        Args:
+            embeddings: Клиент эмбеддингов или None для чисто лексического ранжирования.
+            lexical_weight: Вес лексической оценки (0..1).
+            k1: Параметр насыщения частоты термина BM25.
+            b: Параметр нормализации длины документа BM25.
+        """
+        self.embeddings = embeddings
+        self.lexical_weight = lexical_weight if embeddings is not None else 1.0
+        self.k1 = k1
+        self.b = b
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """
+        Description:
+            Разбивает текст на нормализованные термины.
+
+        Args:
+            text: Текст.
+
+        Returns:
+            Список терминов в нижнем регистре.
+        """
+        return tokenize(text)
+
+    def lexical_scores(self, query: str, docs: List[Document]) -> np.ndarray:
+        """
+        Description:
+            Вычисляет оценки BM25 запроса для набора документов-кандидатов.
+
+        Args:
+            query: Запрос пользователя.
+            docs: Документы-кандидаты.
+
+        Returns:
+            Массив оценок в порядке документов.
+        """
+        doc_terms = [Counter(self.tokenize(doc.page_content)) for doc in docs]
+        lengths = np.array([sum(terms.values()) for terms in doc_terms], dtype=np.float32)
+        avg_length = float(lengths.mean()) if len(docs) and lengths.mean() > 0 else 1.0
+
+        scores = np.zeros(len(docs), dtype=np.float32)
+        for term in set(self.tokenize(query)):
+            frequencies = np.array([terms.get(term, 0) for terms in doc_terms], dtype=np.float32)
+            document_frequency = int(np.count_nonzero(frequencies))
+            if not document_frequency:
+                continue
+            idf = math.log(1 + (len(docs) - document_frequency + 0.5) / (document_frequency + 0.5))
+            scores += idf * frequencies * (self.k1 + 1) / (
+                frequencies + self.k1 * (1 - self.b + self.b * lengths / avg_length)
+            )
+        return scores
+
+    def vector_scores(self, query: str, docs: List[Document]) -> np.ndarray:
+        """
+        Description:
+            Вычисляет косинусную близость запроса и документов.
+
+        Args:
+            query: Запрос пользователя.
+            docs: Документы-кандидаты.
+
+        Returns:
+            Массив оценок в порядке документов.
+        """
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        doc_vectors = np.asarray(self.embeddings.embed_documents([doc.page_content for doc in docs]), dtype=np.float32)
+        norms = np.linalg.norm(doc_vectors, axis=1) * np.linalg.norm(query_vector)
+        return doc_vectors @ query_vector / np.maximum(norms, 1e-12)
+
+    @staticmethod
+    def _min_max(scores: np.ndarray) -> np.ndarray:
+        """
+        Description:
+            Приводит оценки к диапазону [0, 1].
+
+        Args:
+            scores: Исходные оценки.
+
+        Returns:
+            Нормализованные оценки.
+        """
+        spread = scores.max() - scores.min() if len(scores) else 0
+        return (scores - scores.min()) / spread if spread > 0 else np.zeros_like(scores)
+
+    def rerank(self, query: str, docs: List[Document], top_n: int = RAG_TOP_N) -> List[Document]:
+        """
+        Description:
+            Переранжирует документы и оставляет top_n лучших.
+
+        Args:
+            query: Запрос пользователя.
+            docs: Документы-кандидаты.
+            top_n: Количество документов, которые нужно оставить.
+
+        Returns:
+            Отобранные документы в порядке убывания релевантности.
+        """
+        if len(docs) <= 1:
+            return docs[:top_n]
+
+        scores = self.lexical_weight * self._min_max(self.lexical_scores(query, docs))
+        if self.lexical_weight < 1.0:
+            scores += (1 - self.lexical_weight) * self._min_max(self.vector_scores(query, docs))
+
+        order = np.argsort(-scores, kind='stable')[:top_n]
+        return [docs[i] for i in order]
+
+
+class RAGAnswerer:
+    """
+    Description:
+        Генерация ответов по документам с выбираемой стратегией:
+        'stuff' — один вызов LLM с документами в пределах бюджета токенов,
+        'refine' — последовательное уточнение ответа по каждому документу,
+        'map_reduce' — параллельное извлечение фрагментов из документов и один объединяющий вызов.
+        Для каждой стратегии накапливаются метрики задержки и потребления токенов.
+    """
+
+    def __init__(self, chat_model: Any, reranker: Optional[Reranker] = None,
+                 strategy: str = RAG_STRATEGY, fetch_k: int = RAG_FETCH_K, top_n: int = RAG_TOP_N,
+                 token_budget: int = RAG_TOKEN_BUDGET, map_concurrency: int = RAG_MAP_CONCURRENCY,
+                 rrf_k: int = RAG_RRF_K, bm25_fast_confidence: float = RAG_BM25_FAST_CONFIDENCE):
+        """
+        Description:
+            Инициализация генератора ответов.
+
+        Args:
+            chat_model: Чат-модель LangChain.
+            reranker: Переранжировщик документов или None, чтобы использовать порядок индекса.
+            strategy: Стратегия по умолчанию.
+            fetch_k: Количество документов, извлекаемых из индекса.
+            top_n: Количество документов, передаваемых в LLM после переранжирования.
+            token_budget: Бюджет токенов на документы для стратегии 'stuff'.
+            map_concurrency: Количество параллельных вызовов LLM на шаге map.
+            rrf_k: Сглаживающая константа Reciprocal Rank Fusion.
+            bm25_fast_confidence: Уверенность BM25, начиная с которой векторный поиск не выполняется.
+
+        Raises:
+            ValueError: Если стратегия неизвестна.
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown RAG strategy: {strategy}")
+        self.chat_model = chat_model
+        self.reranker = reranker
+        self.strategy = strategy
+        self.fetch_k = fetch_k
+        self.top_n = top_n
+        self.token_budget = token_budget
+        self.map_concurrency = map_concurrency
+        self.rrf_k = rrf_k
+        self.bm25_fast_confidence = bm25_fast_confidence
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._stats_lock = threading.Lock()
+
+    def retrieve(self, query: str, index: FAISS, metrics: RAGMetrics,
+                 lexical_index: Optional[BM25Index] = None) -> List[Document]:
+        """
+        Description:
+            Извлекает документы из индексов и переранжирует их.
+            Если есть BM25 индекс и лексический поиск уверенно находит все значимые термины запроса,
+            используются только его результаты (без запроса эмбеддинга). Иначе результаты BM25
+            и векторного поиска объединяются методом Reciprocal Rank Fusion.
+
+        Args:
+            query: Запрос пользователя.
+            index: FAISS индекс.
+            metrics: Метрики текущего ответа.
+            lexical_index: BM25 индекс того же документа или None для чисто векторного поиска.
+
+        Returns:
+            Документы для генерации ответа.
+        """
+        started = time.perf_counter()
+        lexical_results = lexical_index.search(query, self.fetch_k) if lexical_index is not None else []
+        if lexical_results and lexical_index.confidence(query, lexical_results) >= self.bm25_fast_confidence:
+            metrics.retrieval_mode = 'bm25'
+            metrics.retrieval_s = time.perf_counter() - started
+            # Документы уже ранжированы BM25 по всему индексу, переранжирование не требуется
+            return [doc for doc, _ in lexical_results[:self.top_n]]
+
+        docs = index.similarity_search(query, k=self.fetch_k)
+        if lexical_results:
+            metrics.retrieval_mode = 'hybrid'
+            docs = reciprocal_rank_fusion([[doc for doc, _ in lexical_results], docs], k=self.rrf_k)[:self.fetch_k]
+        metrics.retrieval_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        docs = self.reranker.rerank(query, docs, self.top_n) if self.reranker else docs[:self.top_n]
+        metrics.rerank_s = time.perf_counter() - started
+        return docs
+
+    def _call_llm(self, prompt: str, metrics: RAGMetrics) -> str:
+        """
+        Description:
+            Выполняет один вызов LLM и учитывает потраченные токены.
+
+        Args:
+            prompt: Текст промпта.
+            metrics: Метрики текущего ответа.
+
+        Returns:
+            Текст ответа модели.
+        """
+        message = self.chat_model.invoke([HumanMessage(content=prompt)])
+        self._count_usage(message, metrics)
+        return message.content
+
+    def _stream_llm(self, prompt: str, metrics: RAGMetrics) -> Iterator[str]:
+        """
+        Description:
+            Выполняет вызов LLM в потоковом режиме и учитывает потраченные токены.
+
+        Args:
+            prompt: Текст промпта.
+            metrics: Метрики текущего ответа.
+
+        Yields:
+            Фрагменты (токены) ответа модели по мере генерации.
+        """
+        message = None
+        for chunk in self.chat_model.stream([HumanMessage(content=prompt)]):
+            # Складываем фрагменты, чтобы получить итоговые метаданные об использовании токенов
+            message = chunk if message is None else message + chunk
+            if chunk.content:
+                yield chunk.content
+        if message is not None:
+            self._count_usage(message, metrics)
+
+    def _count_usage(self, message: Any, metrics: RAGMetrics) -> None:
+        """
+        Description:
+            Учитывает вызов LLM и потраченные токены в метриках.
+
+        Args:
+            message: Ответ модели (AIMessage или сумма AIMessageChunk).
+            metrics: Метрики текущего ответа.
+        """
+        usage = getattr(message, 'usage_metadata', None) or {}
+        token_usage = message.response_metadata.get('token_usage', {}) if hasattr(message, 'response_metadata') else {}
+        with self._stats_lock:
+            metrics.llm_calls += 1
+            metrics.prompt_tokens += usage.get('input_tokens', token_usage.get('prompt_tokens', 0))
+            metrics.completion_tokens += usage.get('output_tokens', token_usage.get('completion_tokens', 0))
+
+    def _pack_context(self, docs: List[Document]) -> Tuple[str, List[Document]]:
+        """
+        Description:
+            Собирает контекст из документов, пока не исчерпан бюджет токенов.
+
+        Args:
+            docs: Документы в порядке релевантности.
+
+        Returns:
+            Кортеж (контекст, вошедшие в него документы).
+        """
+        parts, used, budget = [], [], self.token_budget
+        for doc in docs:
+            tokens = count_tokens(doc.page_content)
+            if tokens > budget:
+                if not parts:
+                    # Первый документ обрезаем по бюджету, чтобы контекст не оказался пустым
+                    parts.append(truncate_tokens(doc.page_content, budget))
+                    used.append(doc)
+                break
+            parts.append(doc.page_content)
+            used.append(doc)
+            budget -= tokens
+        return "\n\n".join(parts), used
+
+    def _stuff(self, query: str, docs: List[Document], metrics: RAGMetrics) -> Tuple[str, List[Document]]:
+        """
+        Description:
+            Стратегия stuff: один вызов LLM с документами в пределах бюджета токенов.
+
+        Args:
+            query: Запрос пользователя.
+            docs: Документы в порядке релевантности.
+            metrics: Метрики текущего ответа.
+
+        Returns:
+            Кортеж (промпт итогового вызова LLM, документы, использованные для ответа).
+        """
+        context, used = self._pack_context(docs)
+        return STUFF_PROMPT.format(context=context, question=query), used
+
+    def _refine(self, query: str, docs: List[Document], metrics: RAGMetrics) -> Tuple[str, List[Document]]:
+        """
+        Description:
+            Стратегия refine: первичный ответ по первому документу и последовательное уточнение по остальным.
+
+        Args:
+            query: Запрос пользователя.
+            docs: Документы в порядке релевантности.
+            metrics: Метрики текущего ответа.
+
+        Returns:
+            Кортеж (промпт итогового вызова LLM, документы, использованные для ответа).
+        """
+        if not docs:
+            return self._stuff(query, docs, metrics)
+        prompt = REFINE_INITIAL_PROMPT.format(context=docs[0].page_content, question=query)
+        for doc in docs[1:]:
+            # Промежуточные ответы не передаются клиенту, потоково генерируется только последнее уточнение
+            answer = self._call_llm(prompt, metrics)
+            prompt = REFINE_PROMPT.format(question=query, existing_answer=answer, context=doc.page_content)
+        return prompt, docs
+
+    def _map_reduce(self, query: str, docs: List[Document], metrics: RAGMetrics) -> Tuple[str, List[Document]]:
+        """
+        Description:
+            Стратегия map_reduce: параллельное извлечение фрагментов из документов и объединяющий вызов.
+
+        Args:
+            query: Запрос пользователя.
+            docs: Документы в порядке релевантности.
+            metrics: Метрики текущего ответа.
+
+        Returns:
+            Кортеж (промпт итогового вызова LLM, документы, использованные для ответа).
+        """
+        def map_document(doc: Document) -> str:
+            return self._call_llm(MAP_PROMPT.format(context=doc.page_content, question=query), metrics)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.map_concurrency, len(docs)))) as executor:
+            summaries = list(executor.map(map_document, docs))
+        return REDUCE_PROMPT.format(question=query, summaries="\n\n".join(summaries)), docs
+
+    def stream_answer(self, query: str, index: FAISS, strategy: Optional[str] = None,
+                      lexical_index: Optional[BM25Index] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Description:
+            Отвечает на вопрос по документам индекса в потоковом режиме. Сначала выполняется поиск
+            и промежуточные вызовы стратегии, затем токены итогового вызова LLM передаются по мере генерации.
+            Время до первого токена записывается в метрики и в лог.
+
+        Args:
+            query: Запрос пользователя.
+            index: FAISS индекс.
+            strategy: Стратегия генерации или None для стратегии по умолчанию.
+            lexical_index: BM25 индекс документа или None для чисто векторного поиска.
+
+        Yields:
+            {'type': 'token', 'text': ...} для каждого фрагмента ответа и последнее событие
+            {'type': 'final', 'output_text': ..., 'source_documents': ..., 'metrics': ...}.
+
+        Raises:
+            ValueError: Если стратегия неизвестна.
+        """
+        strategy = strategy or self.strategy
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown RAG strategy: {strategy}")
+
+        metrics = RAGMetrics(strategy=strategy)
+        started = time.perf_counter()
+        docs = self.retrieve(query, index, metrics, lexical_index)
+
+        generation_started = time.perf_counter()
+        prompt, used_docs = getattr(self, f"_{strategy}")(query, docs, metrics)
+
+        parts = []
+        for token in self._stream_llm(prompt, metrics):
+            if not parts:
+                metrics.first_token_s = time.perf_counter() - started
+                logger.info("RAG time to first token: %.3f s (%s)", metrics.first_token_s, strategy)
+            parts.append(token)
+            yield {"type": "token", "text": token}
+
+        metrics.generation_s = time.perf_counter() - generation_started
+        metrics.documents = len(used_docs)
+        metrics.total_s = time.perf_counter() - started
+
+        self._record(metrics)
+        logger.info("RAG answer metrics: %s", asdict(metrics))
+        yield {"type": "final", "output_text": "".join(parts), "source_documents": used_docs, "metrics": asdict(metrics)}
+
+    def answer(self, query: str, index: FAISS, strategy: Optional[str] = None,
+               lexical_index: Optional[BM25Index] = None) -> Dict[str, Any]:
+        """
+        Description:
+            Отвечает на вопрос по документам индекса.
+
+        Args:
+            query: Запрос пользователя.
+            index: FAISS индекс.
+            strategy: Стратегия генерации или None для стратегии по умолчанию.
+            lexical_index: BM25 индекс документа или None для чисто векторного поиска.
+
+        Returns:
+            Словарь с ключами 'output_text', 'source_documents' и 'metrics'.
+
+        Raises:
+            ValueError: Если стратегия неизвестна.
+        """
+        strategy = strategy or self.strategy
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown RAG strategy: {strategy}")
+
+        metrics = RAGMetrics(strategy=strategy)
+        started = time.perf_counter()
+        docs = self.retrieve(query, index, metrics, lexical_index)
+
+        generation_started = time.perf_counter()
+        prompt, used_docs = getattr(self, f"_{strategy}")(query, docs, metrics)
+        output_text = self._call_llm(prompt, metrics)
+        metrics.generation_s = time.perf_counter() - generation_started
+        metrics.documents = len(used_docs)
+        metrics.total_s = time.perf_counter() - started
+        # Без потоковой передачи пользователь видит ответ только после его полной генерации
+        metrics.first_token_s = metrics.total_s
+
+        self._record(metrics)
+        logger.info("RAG answer metrics: %s", asdict(metrics))
+        return {"output_text": output_text, "source_documents": used_docs, "metrics": asdict(metrics)}
+
+    def _record(self, metrics: RAGMetrics) -> None:
+        """
+        Description:
+            Добавляет метрики ответа в накопительную статистику стратегии.
+
+        Args:
+            metrics: Метрики ответа.
+        """
+        with self._stats_lock:
+            stats = self._stats[metrics.strategy]
+            stats['requests'] += 1
+            # Доля ответов по каждому режиму поиска (после усреднения в metrics_summary)
+            stats[f"retrieval_{metrics.retrieval_mode}"] += 1
+            for field in ('llm_calls', 'prompt_tokens', 'completion_tokens', 'generation_s', 'first_token_s', 'total_s'):
+                stats[field] += getattr(metrics, field)
+
+    def metrics_summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Description:
+            Возвращает средние метрики по каждой использованной стратегии.
+
+        Returns:
+            Словарь стратегия -> средние значения метрик на один ответ.
+        """
+        with self._stats_lock:
+            return {
+                strategy: {
+                    'requests': stats['requests'],
+                    **{field: value / stats['requests'] for field, value in stats.items() if field != 'requests'},
+                }
+                for strategy, stats in self._stats.items()
+            }
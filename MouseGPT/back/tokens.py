@@ -0,0 +1,124 @@
+# back/tokens.py
+# ============================
+# БЛОК ИМПОРТОВ
+# ============================
+# Импорт стандартных библиотек
+import logging
+from functools import lru_cache
+
+# Импорт аннотаций типов
+from typing import List, Optional
+
+# Импорт внешних библиотек
+import tiktoken
+
+# Среднее количество символов на токен, используемое для оценки, если токенизатор недоступен
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str = 'gpt-4o-mini') -> Optional[tiktoken.Encoding]:
+    """
+    Description:
+        Возвращает токенизатор tiktoken для модели (загружается один раз на процесс).
+
+    Args:
+        model: Имя модели OpenAI.
+
+    Returns:
+        tiktoken.Encoding: Токенизатор модели или cl100k_base, если модель неизвестна.
+        None, если словарь токенизатора не удалось загрузить (например, без доступа к сети).
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding('cl100k_base')
+    except Exception as e:
+        logging.warning(f"Tokenizer for {model} is unavailable, token counts are estimated: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str = 'gpt-4o-mini') -> int:
+    """
+    Description:
+        Подсчитывает количество токенов в тексте.
+
+    Args:
+        text: Текст.
+        model: Имя модели OpenAI, токенизатор которой используется.
+
+    Returns:
+        Количество токенов.
+
+    Examples:
+        >>> count_tokens("Hello world")
+        2
+    """
+    encoding = get_encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = 'gpt-4o-mini') -> str:
+    """
+    Description:
+        Обрезает текст до заданного количества токенов.
+
+    Args:
+        text: Текст.
+        max_tokens: Максимальное количество токенов.
+        model: Имя модели OpenAI, токенизатор которой используется.
+
+    Returns:
+        Текст, содержащий не более max_tokens токенов.
+    """
+    encoding = get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+
+def tail_tokens(text: str, max_tokens: int, model: str = 'gpt-4o-mini') -> str:
+    """
+    Description:
+        Возвращает окончание текста длиной не более заданного количества токенов.
+
+    Args:
+        text: Текст.
+        max_tokens: Максимальное количество токенов.
+        model: Имя модели OpenAI, токенизатор которой используется.
+
+    Returns:
+        Последние max_tokens токенов текста.
+    """
+    if max_tokens <= 0:
+        return ""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return text[-max_tokens * CHARS_PER_TOKEN:]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[-max_tokens:])
+
+
+def split_tokens(text: str, max_tokens: int, model: str = 'gpt-4o-mini') -> List[str]:
+    """
+    Description:
+        Разрезает текст на последовательные части не длиннее заданного количества токенов.
+
+    Args:
+        text: Текст.
+        max_tokens: Максимальное количество токенов в части.
+        model: Имя модели OpenAI, токенизатор которой используется.
+
+    Returns:
+        Список частей текста.
+    """
+    encoding = get_encoding(model)
+    if encoding is None:
+        step = max_tokens * CHARS_PER_TOKEN
+        return [text[i:i + step] for i in range(0, len(text), step)]
+    tokens = encoding.encode(text, disallowed_special=())
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
@@ -2,16 +2,18 @@
 import nbformat
 from   nbformat import read
 
-def ipynb_loader(file_path: str):
+from back.chunking import Unit, notebook_units
+
+def ipynb_loader(file_path: str) -> list[Unit]:
     """
     Description:
-      Загружает .ipynb файл и возвращает список документов.
+      Загружает .ipynb файл и возвращает его ячейки кода и Markdown как структурные блоки.
 
     Args:
         file_path: Путь к .ipynb файлу.
 
     Returns:
-        Список текстовых чанков, извлеченных из .ipynb файла.
+        Список блоков (Unit), по одному на ячейку; ячейки-заголовки отмечены для чанкера.
 
     Raises:
         FileNotFoundError: Если указанный файл не найден.
@@ -21,10 +23,4 @@ def ipynb_loader(file_path: str):
         nb = read(f, as_version=4)
     
     # Проход по ячейкам и извлечение текста
-    chunks = []
-    for cell in nb.cells:
-        if cell.cell_type == 'code' or cell.cell_type == 'markdown':
-            chunks.append(cell.source)
-    
-    # Вернем список чанков для обработки
-    return chunks
+    return list(notebook_units(nb.cells))
@@ -0,0 +1,285 @@
+# back/tools/media_segmenter.py
+# ============================
+# БЛОК ИМПОРТОВ
+# ============================
+# Импорт стандартных библиотек
+import os
+import subprocess
+import tempfile
+from contextlib import contextmanager, nullcontext
+
+# Импорт аннотаций типов
+from typing import Iterator, Optional, Tuple, Union
+
+# Импорт внешних библиотек
+import numpy as np
+
+# Импорт внутренних библиотек
+from back.config import (
+    FFMPEG_BINARY,
+    FFPROBE_BINARY,
+    MEDIA_SAMPLE_RATE,
+    MEDIA_CHANNELS,
+    MEDIA_CHUNK_BITRATE,
+    WHISPER_MAX_UPLOAD_MB,
+    MEDIA_SILENCE_SEARCH_S,
+    MEDIA_SILENCE_FRAME_MS,
+    MEDIA_SILENCE_THRESHOLD_DB,
+    MEDIA_CHUNK_OVERLAP_S,
+)
+
+# Размер одного сэмпла PCM s16le в байтах
+SAMPLE_WIDTH = 2
+
+# Длительность окна, которым PCM читается из ffmpeg (в секундах)
+READ_WINDOW_S = 30
+
+# Доля лимита загрузки, которую может занимать чанк (запас на заголовки и неточность битрейта)
+UPLOAD_SAFETY_RATIO = 0.9
+
+
+def probe_duration(file_path: str) -> Optional[float]:
+    """
+    Description:
+        Определяет длительность медиафайла через ffprobe, не декодируя его.
+
+    Args:
+        file_path: Путь к аудио или видео файлу.
+
+    Returns:
+        Длительность в секундах или None, если ffprobe не смог её определить.
+    """
+    try:
+        result = subprocess.run(
+            [FFPROBE_BINARY, '-v', 'error', '-show_entries', 'format=duration',
+             '-of', 'default=noprint_wrappers=1:nokey=1', file_path],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True
+        )
+        return float(result.stdout.decode().strip())
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return None
+
+
+def iter_pcm_windows(file_path: str, window_s: float,
+                     sample_rate: int = MEDIA_SAMPLE_RATE,
+                     channels: int = MEDIA_CHANNELS) -> Iterator[bytes]:
+    """
+    Description:
+        Читает медиафайл через pipe ffmpeg и выдаёт окна PCM (s16le) фиксированной длительности.
+        В памяти одновременно находится только одно окно, поэтому потребление памяти
+        не зависит от длительности файла.
+
+    Args:
+        file_path: Путь к аудио или видео файлу.
+        window_s: Длительность окна в секундах.
+        sample_rate: Частота дискретизации выходного PCM.
+        channels: Количество каналов выходного PCM.
+
+    Returns:
+        Итератор по байтовым окнам PCM. Последнее окно может быть короче.
+
+    Raises:
+        RuntimeError: Если ffmpeg завершился с ошибкой, не вернув ни одного окна.
+    """
+    window_bytes = int(window_s * sample_rate) * channels * SAMPLE_WIDTH
+
+    # Ошибки ffmpeg пишем во временный файл, чтобы переполненный pipe stderr не заблокировал процесс
+    with tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(
+            [FFMPEG_BINARY, '-nostdin', '-hide_banner', '-loglevel', 'error',
+             '-i', file_path, '-vn', '-ac', str(channels), '-ar', str(sample_rate),
+             '-f', 's16le', 'pipe:1'],
+            stdout=subprocess.PIPE, stderr=stderr_file
+        )
+        windows_count = 0
+        try:
+            while True:
+                window = process.stdout.read(window_bytes)
+                if not window:
+                    break
+                windows_count += 1
+                yield window
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+
+        if process.returncode != 0 and windows_count == 0:
+            stderr_file.seek(0)
+            error = stderr_file.read().decode(errors='replace').strip()
+            raise RuntimeError(f"ffmpeg failed to decode {file_path}: {error}")
+
+
+@contextmanager
+def encode_chunk(pcm: bytes, sample_rate: int = MEDIA_SAMPLE_RATE,
+                 channels: int = MEDIA_CHANNELS, bitrate: str = MEDIA_CHUNK_BITRATE) -> Iterator[str]:
+    """
+    Description:
+        Кодирует окно PCM в уникальный временный mp3 файл и удаляет его при выходе из контекста.
+
+    Args:
+        pcm: Байты PCM s16le.
+        sample_rate: Частота дискретизации PCM.
+        channels: Количество каналов PCM.
+        bitrate: Битрейт mp3.
+
+    Returns:
+        Путь к временному mp3 файлу (внутри контекста).
+
+    Raises:
+        subprocess.CalledProcessError: Если ffmpeg не смог закодировать чанк.
+
+    Examples:
+        >>> with encode_chunk(window) as chunk_path:
+        ...     upload(chunk_path)
+    """
+    fd, chunk_path = tempfile.mkstemp(prefix='mousegpt_chunk_', suffix='.mp3')
+    os.close(fd)
+    try:
+        subprocess.run(
+            [FFMPEG_BINARY, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y',
+             '-f', 's16le', '-ar', str(sample_rate), '-ac', str(channels), '-i', 'pipe:0',
+             '-b:a', bitrate, chunk_path],
+            input=pcm, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True
+        )
+        yield chunk_path
+    finally:
+        if os.path.exists(chunk_path):
+            os.remove(chunk_path)
+
+
+def max_chunk_duration(bitrate: str = MEDIA_CHUNK_BITRATE,
+                       max_upload_mb: float = WHISPER_MAX_UPLOAD_MB) -> float:
+    """
+    Description:
+        Вычисляет максимальную длительность чанка, при которой закодированный mp3
+        гарантированно помещается в лимит загрузки API.
+
+    Args:
+        bitrate: Битрейт mp3 в формате ffmpeg (например, '64k').
+        max_upload_mb: Лимит размера загружаемого файла в мегабайтах.
+
+    Returns:
+        Максимальная длительность чанка в секундах.
+
+    Examples:
+        >>> max_chunk_duration('64k', 25)
+        2949.12
+    """
+    multipliers = {'k': 1_000, 'm': 1_000_000}
+    suffix = bitrate[-1].lower()
+    bits_per_second = float(bitrate[:-1]) * multipliers[suffix] if suffix in multipliers else float(bitrate)
+    return max_upload_mb * 1024 * 1024 * UPLOAD_SAFETY_RATIO * 8 / bits_per_second
+
+
+def find_silence_cut(samples: np.ndarray, search_start: int, search_end: int,
+                     frame_len: int, threshold_db: float = MEDIA_SILENCE_THRESHOLD_DB) -> int:
+    """
+    Description:
+        Ищет точку разреза в паузе внутри окна поиска с помощью векторизованного расчёта RMS энергии.
+        Из кадров тише порога выбирается ближайший к концу окна (чтобы чанк был максимально длинным),
+        если таких нет — самый тихий кадр окна.
+
+    Args:
+        samples: Массив сэмплов формы (n, channels) в формате int16.
+        search_start: Индекс сэмпла, с которого начинается окно поиска.
+        search_end: Индекс сэмпла, которым заканчивается окно поиска (он же жёсткая граница чанка).
+        frame_len: Длина кадра в сэмплах.
+        threshold_db: Порог тишины в dBFS.
+
+    Returns:
+        Индекс сэмпла, по которому следует разрезать чанк.
+    """
+    n_frames = (search_end - search_start) // frame_len
+    if n_frames <= 0:
+        return search_end
+
+    frames = samples[search_start:search_start + n_frames * frame_len].astype(np.float32)
+    frames = frames.reshape(n_frames, -1) / 32768.0
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+
+    threshold = 10 ** (threshold_db / 20)
+    quiet = np.flatnonzero(rms <= threshold)
+    frame_index = quiet[-1] if quiet.size else int(np.argmin(rms))
+
+    # Режем по середине найденного кадра
+    return int(search_start + frame_index * frame_len + frame_len // 2)
+
+
+def iter_media_chunks(file_path: str, chunk_duration_s: float,
+                      search_window_s: float = MEDIA_SILENCE_SEARCH_S,
+                      overlap_s: float = MEDIA_CHUNK_OVERLAP_S,
+                      frame_ms: int = MEDIA_SILENCE_FRAME_MS,
+                      sample_rate: int = MEDIA_SAMPLE_RATE,
+                      channels: int = MEDIA_CHANNELS,
+                      encode: bool = True) -> Iterator[Tuple[float, float, Union[str, np.ndarray]]]:
+    """
+    Description:
+        Потоково нарезает медиафайл на mp3 чанки, границы которых привязаны к паузам в речи.
+        Длительность чанка не превышает chunk_duration_s и лимита загрузки API, соседние чанки
+        перекрываются на overlap_s. Каждый чанк существует на диске только пока потребитель
+        обрабатывает его, а в памяти хранится не больше одного чанка PCM и одного окна чтения.
+
+    Args:
+        file_path: Путь к аудио или видео файлу.
+        chunk_duration_s: Максимальная длительность чанка в секундах.
+        search_window_s: Окно перед границей чанка, в котором ищется пауза (0 — резать ровно по границе).
+        overlap_s: Перекрытие соседних чанков в секундах.
+        frame_ms: Длина кадра для расчёта RMS энергии в миллисекундах.
+        sample_rate: Частота дискретизации промежуточного PCM.
+        channels: Количество каналов промежуточного PCM.
+        encode: True — кодировать чанк в mp3 (для загрузки в API), False — отдавать PCM
+            в виде массива float32 в диапазоне [-1, 1] (первый канал) для локальной модели.
+
+    Returns:
+        Итератор кортежей (начало в секундах, конец в секундах, путь к mp3 чанку или массив PCM).
+
+    Examples:
+        >>> for start, end, chunk_path in iter_media_chunks("lecture.mp4", 1200):
+        ...     transcribe(chunk_path)
+    """
+    # Ограничиваем длительность чанка так, чтобы mp3 поместился в лимит загрузки API
+    # (PCM для локальной модели никуда не загружается, поэтому лимит к нему не применяется)
+    max_duration_s = min(chunk_duration_s, max_chunk_duration()) if encode else chunk_duration_s
+    chunk_len   = int(max_duration_s * sample_rate)
+    search_len  = min(int(search_window_s * sample_rate), chunk_len // 2)
+    overlap_len = min(int(overlap_s * sample_rate), chunk_len // 4)
+    frame_len   = max(int(frame_ms * sample_rate / 1000), 1)
+
+    # Буфер выделяется один раз: максимум один чанк и одно окно чтения
+    buffer = np.empty((chunk_len + int(READ_WINDOW_S * sample_rate), channels), dtype=np.int16)
+    filled = 0
+    buffer_start = 0
+
+    def emit(cut: int):
+        start = buffer_start / sample_rate
+        end = (buffer_start + cut) / sample_rate
+        if not encode:
+            # Копия: буфер переиспользуется для следующего чанка
+            return start, end, nullcontext(buffer[:cut, 0].astype(np.float32) / 32768.0)
+        return start, end, encode_chunk(buffer[:cut].tobytes(), sample_rate, channels)
+
+    for window in iter_pcm_windows(file_path, READ_WINDOW_S, sample_rate, channels):
+        samples = np.frombuffer(window, dtype=np.int16).reshape(-1, channels)
+        buffer[filled:filled + len(samples)] = samples
+        filled += len(samples)
+
+        # Пока в буфере набрался полный чанк, режем его по ближайшей к границе паузе
+        while filled >= chunk_len:
+            cut = find_silence_cut(buffer, chunk_len - search_len, chunk_len, frame_len)
+            start, end, chunk = emit(cut)
+            with chunk as chunk_path:
+                yield start, end, chunk_path
+
+            # Следующий чанк начинается чуть раньше разреза, чтобы слово на границе попало в оба чанка
+            next_start = cut - overlap_len
+            buffer[:filled - next_start] = buffer[next_start:filled]
+            filled -= next_start
+            buffer_start += next_start
+
+    # Остаток, который не состоит из одного только перекрытия с предыдущим чанком
+    if filled > (overlap_len if buffer_start else 0):
+        start, end, chunk = emit(filled)
+        with chunk as chunk_path:
+            yield start, end, chunk_path
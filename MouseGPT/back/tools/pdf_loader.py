@@ -2,37 +2,201 @@
 # ============================
 # БЛОК ИМПОРТОВ
 # ============================
+# Импорт стандартных библиотек
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
 # Импорт аннотаций типов
-from typing import List
+from typing import Iterator, List, Optional
+
+# Импорт внешних библиотек
+from pypdf import PdfReader
 
 # Импорт библиотек LangChain
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_community.vectorstores import FAISS
-from langchain_community.document_loaders import PyPDFLoader
 
-def pdf_loader(file_path: str) -> List[str]:
+# Импорт внутренних библиотек
+from back.config import PDF_EXTRACT_WORKERS, PDF_EXTRACT_BATCH_PAGES, FAISS_ADD_BATCH_SIZE
+from back.embeddings import get_embeddings
+
+
+def _extract_pages(file_path: str, start: int, stop: int) -> List[str]:
+    """
+    Description:
+        Извлекает текст диапазона страниц PDF файла. Выполняется в процессе пула,
+        поэтому файл открывается заново в каждом вызове.
+
+    Args:
+        file_path: Путь к PDF файлу.
+        start: Номер первой страницы (с нуля).
+        stop: Номер страницы, следующей за последней.
+
+    Returns:
+        Тексты страниц диапазона.
+    """
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def iter_pdf_pages(file_path: str, workers: int = PDF_EXTRACT_WORKERS,
+                   batch_pages: int = PDF_EXTRACT_BATCH_PAGES) -> Iterator[Document]:
+    """
+    Description:
+        Лениво извлекает страницы PDF файла по одной, не загружая весь документ.
+        При workers > 0 извлечение текста (CPU-bound) выполняется в пуле процессов пакетами
+        по batch_pages страниц; в работе одновременно находится не больше 2 * workers пакетов,
+        порядок страниц сохраняется.
+
+    Args:
+        file_path: Путь к PDF файлу.
+        workers: Количество процессов для извлечения текста (0 — в текущем процессе).
+        batch_pages: Количество страниц в одном задании пула.
+
+    Yields:
+        Document для каждой страницы с метаданными 'source' и 'page' (с нуля), как у PyPDFLoader.
+
+    Raises:
+        FileNotFoundError: Если указанный файл не найден.
+        PdfReadError: Если файл не является допустимым PDF.
+    """
+    reader = PdfReader(file_path)
+    total_pages = len(reader.pages)
+
+    if workers <= 0:
+        for i in range(total_pages):
+            yield Document(page_content=reader.pages[i].extract_text() or "",
+                           metadata={'source': file_path, 'page': i})
+        return
+
+    ranges = iter([(start, min(start + batch_pages, total_pages)) for start in range(0, total_pages, batch_pages)])
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: "deque[tuple[int, Future]]" = deque()
+
+        def submit_next() -> None:
+            batch = next(ranges, None)
+            if batch is not None:
+                pending.append((batch[0], executor.submit(_extract_pages, file_path, *batch)))
+
+        for _ in range(2 * workers):
+            submit_next()
+
+        while pending:
+            start, future = pending.popleft()
+            submit_next()
+            for offset, text in enumerate(future.result()):
+                yield Document(page_content=text, metadata={'source': file_path, 'page': start + offset})
+
+
+class IncrementalFAISSBuilder:
+    """
+    Description:
+        Инкрементальное построение FAISS индекса: документы накапливаются пакетами,
+        каждый пакет векторизуется в фоновом потоке и добавляется в индекс, пока
+        вызывающий код продолжает обработку (например, суммаризацию).
+    """
+
+    def __init__(self, embeddings: Optional[Embeddings] = None, batch_size: int = FAISS_ADD_BATCH_SIZE):
+        """
+        Description:
+            Инициализация построителя индекса.
+
+        Args:
+            embeddings: Клиент эмбеддингов или None для общего слоя эмбеддингов.
+            batch_size: Количество документов в одном пакете векторизации.
+        """
+        self.embeddings = embeddings or get_embeddings()
+        self.batch_size = batch_size
+        self.store: Optional[FAISS] = None
+        self._batch: List[Document] = []
+        # Один поток сохраняет порядок добавления пакетов в индекс
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mousegpt-faiss')
+        self._futures: List[Future] = []
+
+    def add(self, doc: Document) -> None:
+        """
+        Description:
+            Добавляет документ; заполненный пакет отправляется на векторизацию.
+
+        Args:
+            doc: Документ (страница PDF).
+        """
+        if not doc.page_content.strip():
+            return
+        self._batch.append(doc)
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        """
+        Description:
+            Отправляет накопленный пакет на векторизацию и добавление в индекс.
+        """
+        if self._batch:
+            self._futures.append(self._executor.submit(self._add_batch, self._batch))
+            self._batch = []
+
+    def _add_batch(self, docs: List[Document]) -> None:
+        """
+        Description:
+            Векторизует пакет документов и добавляет его в индекс.
+
+        Args:
+            docs: Пакет документов.
+        """
+        texts = [doc.page_content for doc in docs]
+        vectors = self.embeddings.embed_documents(texts)
+        metadatas = [doc.metadata for doc in docs]
+        if self.store is None:
+            self.store = FAISS.from_embeddings(list(zip(texts, vectors)), self.embeddings, metadatas=metadatas)
+        else:
+            self.store.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas)
+
+    def finish(self) -> Optional[FAISS]:
+        """
+        Description:
+            Дожидается векторизации всех пакетов и возвращает построенный индекс.
+
+        Returns:
+            FAISS: Индекс или None, если в документе нет текста.
+
+        Raises:
+            Exception: Ошибка векторизации любого из пакетов.
+        """
+        self._flush()
+        try:
+            for future in self._futures:
+                future.result()
+        finally:
+            self._executor.shutdown(wait=True)
+        return self.store
+
+    def close(self) -> None:
+        """
+        Description:
+            Останавливает фоновую векторизацию без ожидания (например, при отмене задачи).
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def pdf_loader(file_path: str) -> Iterator[Document]:
     """
     Description:
-      Загружает PDF-файл и возвращает список документов.
+      Загружает PDF-файл постранично и возвращает генератор документов.
 
     Args:
         file_path: Путь к PDF-файлу.
 
     Returns:
-        Список документов, загруженных из PDF-файла.
+        Генератор документов, по одному на страницу PDF-файла.
 
     Raises:
         FileNotFoundError: Если указанный файл не найден.
         ValueError: Если файл не является допустимым PDF.
 
     Examples:
-        >>> pdf_loader("example.pdf")
+        >>> [doc.page_content for doc in pdf_loader("example.pdf")]
         ['Document content as a string.']
     """
-    loader = PyPDFLoader(file_path)
-    docs = loader.load()
-    
-    embeddings = OpenAIEmbeddings()
-    faiss_index = FAISS.from_documents(docs, embeddings)
-    
-    return docs, faiss_index
\ No newline at end of file
+    return iter_pdf_pages(file_path)
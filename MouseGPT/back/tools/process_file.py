@@ -4,7 +4,11 @@
 # ============================
 # Импорт стандартных библиотек
 import os
-from pathlib import Path
+import time
+import uuid
+
+# Импорт аннотаций типов
+from typing import Iterator
 
 # Импорт внешних библиотек
 from werkzeug.utils import secure_filename
@@ -13,180 +17,239 @@ from werkzeug.utils import secure_filename
 from langsmith import traceable
 
 # Импорт внутренних библиотек
-from back.tools.pdf_loader import pdf_loader
+from back.tools.pdf_loader import pdf_loader, IncrementalFAISSBuilder
 from back.tools.ipynb_loader import ipynb_loader
-from back.tools.transcribe_media import transcribe_media, merge_chunks
+from back.tools.transcribe_media import transcribe_media
+from back.chunking import iter_chunks, page_units
+from back.bm25 import BM25Index
+
+def save_upload(file, upload_folder: str) -> str:
+    """
+    Description:
+        Сохраняет загруженный файл в отдельную поддиректорию директории загрузок.
+        Каждая загрузка получает уникальную директорию, поэтому одновременные загрузки файлов
+        с одинаковыми именами (и созданные по ним суммаризации и индексы) не перезаписывают друг друга.
+
+    Args:
+        file: Загруженный файл (werkzeug FileStorage).
+        upload_folder: Директория для сохранения (например, рабочее пространство сессии).
+
+    Returns:
+        Путь к сохраненному файлу.
+
+    Raises:
+        ValueError: Если файл не выбран.
+    """
+    if not file or file.filename == '':
+        raise ValueError("No selected file")
+
+    filename = secure_filename(file.filename) or 'upload'
+    upload_directory = os.path.join(upload_folder, uuid.uuid4().hex[:12])
+    os.makedirs(upload_directory, exist_ok=True)
+    file_path = os.path.join(upload_directory, filename)
+    file.save(file_path)
+    return file_path
+
 
 @traceable
-def process_file(file, agent, file_manager, session, process_func, chunk_prompt_type: str) -> str:
+def process_file(file_path: str, agent, file_manager, process_func, chunk_prompt_type: str, job=None) -> dict:
     """
     Description:
         Обрабатывает загруженные файлы (PDF, IPYNB, видео, аудео) и создает суммаризацию.
+        Функция не зависит от контекста запроса Flask и выполняется в фоновой задаче.
 
     Args:
-        file: Загруженный файл.
+        file_path: Путь к сохраненному файлу.
         agent: Экземпляр агента для обработки текста.
         file_manager: Менеджер для работы с файлами.
-        session: Сессия для хранения информации о файлах.
         process_func: Функция для обработки конкретного типа файла.
         chunk_prompt_type: Тип запроса для обработки чанков.
+        job: Контекст фоновой задачи (JobContext) для отчета о прогрессе и проверки отмены или None.
 
     Returns:
-        Имя файла с суммаризацией.
+        Словарь с результатами: имя файла суммаризации ('summary_filename'), количество чанков ('chunks'),
+        количество вызовов LLM ('llm_calls') и артефакты, созданные обработчиком типа файла (например, 'faiss_index_filename').
     
     Raises:
-        ValueError: Если файл не выбран.
+        ValueError: Если в файле нет содержимого для суммаризации.
+        JobCancelled: Если фоновая задача была отменена.
     """
-    from app import app
-
-    if file.filename == '':
-        return "No selected file", 400
+    def report(stage: str, current: int = 0, total: int = 0, message: str = "") -> None:
+        if job is not None:
+            job.progress(stage, current, total, message)
 
-    filename = secure_filename(file.filename)
-    file_base_name = os.path.splitext(filename)[0]
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(file_path)
-
-    # Проверяем, если функция требует только file_path
-    if process_func.__name__ == 'process_ipynb_file':
-        chunks = process_func(file_path)
-    else:
-        chunks = process_func(file_manager, session, file_path)
+    file_base_name = os.path.splitext(os.path.basename(file_path))[0]
+    # Результаты сохраняются рядом с загруженным файлом (пути относительно рабочей директории)
+    output_prefix = file_manager.relative_name(os.path.dirname(file_path))
 
-    if not chunks:
-        print("❌ No chunks received from process_func")
-        return "Error: No content to summarize"
-    
-    summary_filename = f"{file_base_name}_summary.md"
-    summary = ""
+    # Извлечение чанков; обработчик может добавить в artifacts созданные файлы (например, FAISS индекс).
+    # Чанки поступают по мере чтения файла, поэтому суммаризация первого чанка не ждет разбора всего документа
+    report('extract', message=f"Extracting content from {os.path.basename(file_path)}")
+    artifacts = {}
+    chunks = process_func(file_manager, artifacts, file_path)
 
-    # Проверяем, существует ли файл
-    file_exists = Path(file_manager.working_directory / summary_filename).exists()
+    summary_filename = os.path.join(output_prefix, f"{file_base_name}_summary.md")
+    summary_parts = []
 
     # Генерация суммаризации по чанкам
-    total_chunks = len(chunks)
-    print(f"🚀 Начинаем обработку {total_chunks} чанков текста.")
+    print(f"🚀 Начинаем потоковую обработку чанков текста.")
     print("📊 " + "-" * 50)
-
-    for i, chunk in enumerate(chunks, 1):
-        progress = i/total_chunks*100
-        print(f"⏳ Обработка чанка {i}/{total_chunks} [{progress:.1f}%]")
-        
-        prompt = file_manager.read_document(
-            f'prompts/{chunk_prompt_type}_chank_prompt.txt'
-        ) + "\n" + chunk
-        summarized_content = agent.process_message({"content": prompt})
+    chunk_prompt = file_manager.read_prompt(f'prompts/{chunk_prompt_type}_chank_prompt.txt')
+    started = time.perf_counter()
+
+    # Суммаризация пишется во временный файл и публикуется целиком после финальной суммаризации,
+    # поэтому /download_summary не отдает частично записанный файл, а отмененная задача его не оставляет
+    with file_manager.open_document_writer(summary_filename) as writer:
+        writer.write(f"# Summarization for {file_base_name}\n")
+
+        total_chunks = 0
+        for i, chunk in enumerate(chunks, 1):
+            if i == 1:
+                print(f"⏱️ Первый чанк получен через {time.perf_counter() - started:.2f} с")
+            total_chunks = i
+            print(f"⏳ Обработка чанка {i}")
+            report('summarize', i)
+            
+            prompt = chunk_prompt + "\n" + chunk
+            summarized_content = agent.process_message({"content": prompt})
+            
+            print(f"📝 Результат суммаризации чанка {i}:")
+            print(f"✨ Суммаризация выполнена успешно")
+            print("📊 " + "-" * 50)
+            
+            summary_parts.append(summarized_content)
+            
+            print(f"📎 Добавление данных в файл суммаризации")
+            writer.write(f"\n## Chunk {i}\n{summarized_content}\n")
+
+        if not total_chunks:
+            print("❌ No chunks received from process_func")
+            raise ValueError("No content to summarize")
+
+        summary = "\n".join(summary_parts) + "\n"
+
+        # Один вызов LLM на чанк и один на финальную суммаризацию
+        llm_calls = total_chunks + 1
+        file_type = os.path.splitext(file_path)[1].lstrip('.').lower()
+        print(f"📊 Чанков: {total_chunks}, вызовов LLM для файла .{file_type}: {llm_calls}")
+
+        # Финальная суммаризация
+        print("🎯 Подготовка финальной суммаризации...")
+        report('final', total_chunks, total_chunks)
+        final_summary_prompt = f"Summarize the following text in a concise manner:\n\n{summary}"
+        final_summary = agent.process_message({"content": final_summary_prompt})
         
-        print(f"📝 Результат суммаризации чанка {i}:")
-        print(f"✨ Суммаризация выполнена успешно")
-        print("📊 " + "-" * 50)
-        
-        summary += summarized_content + "\n"
-        
-        if i == 0 and not file_exists:
-            print(f"📁 Создание нового файла суммаризации")
-            file_manager.write_document(
-                f"# Summarization for {file_base_name}\n\n## Chunk {i+1}\n{summarized_content}\n",
-                summary_filename
-            )
-        else:
-            print(f"📎 Добавление данных в существующий файл")
-            file_manager.append_document(
-                f"\n## Chunk {i+1}\n{summarized_content}\n",
-                summary_filename
-            )
-
-    # Финальная суммаризация
-    print("🎯 Подготовка финальной суммаризации...")
-    final_summary_prompt = f"Summarize the following text in a concise manner:\n\n{summary}"
-    final_summary = agent.process_message({"content": final_summary_prompt})
+        # Добавляем финальную суммаризацию и публикуем файл
+        print("📌 Сохранение финальной суммаризации")
+        writer.write("\n## Final Summary\n" + final_summary + "\n")
     
-    # Добавляем финальную суммаризацию к существующему файлу
-    print("📌 Сохранение финальной суммаризации")
-    file_manager.append_document(
-        "\n## Final Summary\n" + final_summary + "\n",
-        summary_filename
-    )
-    
-    session['summary_filename'] = summary_filename
     print("✅ Обработка файла успешно завершена!")
+    if getattr(agent, 'response_cache', None):
+        stats = agent.response_cache.stats()
+        print(f"💾 Кэш ответов LLM: попаданий {stats['hits']}, промахов {stats['misses']} (с запуска процесса)")
 
-    return summary_filename
+    return {
+        'summary_filename': summary_filename,
+        'final_summary': final_summary,
+        'chunks': total_chunks,
+        'llm_calls': llm_calls,
+        **artifacts
+    }
 
 
-def process_pdf_file(file_manager, session, file_path: str) -> list[str]:
+def process_pdf_file(file_manager, artifacts: dict, file_path: str) -> Iterator[str]:
     """
     Description:
-        Обрабатывает PDF файл, создавая FAISS индекс и возвращает содержание страниц.
+        Обрабатывает PDF файл постранично: страницы читаются лениво и одновременно передаются
+        чанкеру (для суммаризации), в FAISS индекс, который достраивается пакетами в фоне,
+        и в BM25 индекс для локального лексического поиска. После чтения последней страницы
+        оба индекса сохраняются рядом друг с другом.
 
     Args:
         file_manager: Менеджер для работы с файлами.
-        session: Сессия для хранения данных о файлах.
+        artifacts: Словарь, в который записываются имена созданных FAISS и BM25 индексов.
         file_path: Путь к PDF файлу.
 
-    Returns:
-        Список страниц PDF файла в текстовом формате.
+    Yields:
+        Чанки текста PDF файла, упакованные по бюджету токенов с учетом границ страниц и разделов.
     """
-    from app import app
-
-    pdf_pages, faiss_index = pdf_loader(file_path)
-    
-    # Сохранение Faiss индекса
-    unique_filename = os.path.join(app.config['UPLOAD_FOLDER'], f"{os.path.splitext(os.path.basename(file_path))[0]}.faiss")
-    file_manager.save_faiss_index(faiss_index.index, unique_filename)
-    session['faiss_index_filename'] = unique_filename
-
-    return [page.page_content for page in pdf_pages]
-
-
-def process_ipynb_file(file_path: str) -> list[str]:
+    builder = IncrementalFAISSBuilder()
+    lexical_index = BM25Index()
+
+    def pages() -> Iterator[str]:
+        for page in pdf_loader(file_path):
+            builder.add(page)
+            lexical_index.add_documents([page])
+            yield page.page_content
+
+    try:
+        yield from iter_chunks(page_units(pages()))
+        faiss_index = builder.finish()
+    finally:
+        builder.close()
+
+    if faiss_index is None:
+        print("⚠️ В PDF файле нет текста, FAISS индекс не создан")
+        return
+
+    # Сохранение Faiss и BM25 индексов (имена задаются относительно рабочей директории файл-менеджера)
+    base_name = os.path.join(file_manager.relative_name(os.path.dirname(file_path)),
+                             os.path.splitext(os.path.basename(file_path))[0])
+    file_manager.save_faiss_index(faiss_index, f"{base_name}.faiss")
+    file_manager.save_bm25_index(lexical_index, f"{base_name}.bm25.json")
+    artifacts['faiss_index_filename'] = f"{base_name}.faiss"
+    artifacts['bm25_index_filename'] = f"{base_name}.bm25.json"
+
+
+def process_ipynb_file(file_manager, artifacts: dict, file_path: str) -> Iterator[str]:
     """
     Description:
         Обрабатывает Jupyter Notebook файл, возвращая его содержание.
 
     Args:
+        file_manager: Менеджер для работы с файлами.
+        artifacts: Словарь для артефактов обработки (не используется).
         file_path: Путь к IPYNB файлу.
 
     Returns:
-        Список строк с содержанием IPYNB файла.
+        Генератор чанков ноутбука: мелкие ячейки объединяются, заголовки Markdown начинают новый чанк.
     """
-    return ipynb_loader(file_path)
+    return iter_chunks(ipynb_loader(file_path))
 
-def process_audio_file(file_path: str) -> list[str]:
+def process_audio_file(file_manager, artifacts: dict, file_path: str) -> Iterator[str]:
     """
     Description:
         Обрабатывает аудиофайл: транскрибирует его и объединяет чанки.
 
     Args:
+        file_manager: Менеджер для работы с файлами.
+        artifacts: Словарь для артефактов обработки (не используется).
         file_path: Путь к аудиофайлу.
 
     Returns:
-        Список объединенных чанков транскрибированного текста.
+        Генератор чанков транскрибированного текста, упакованных по бюджету токенов.
     """
     transcribed_chunks = transcribe_media(file_path)
-    merged_chunks = merge_chunks(transcribed_chunks)
-    return merged_chunks
+    return iter_chunks(transcribed_chunks)
 
 
-def process_video_file(file_manager, session, file_path: str) -> list[str]:
+def process_video_file(file_manager, artifacts: dict, file_path: str) -> Iterator[str]:
     """
     Description:
         Обрабатывает видеофайл, транскрибируя его в текстовые чанки.
 
     Args:
         file_manager: Менеджер для работы с файлами.
-        session: Сессия для хранения данных о файлах.
+        artifacts: Словарь для артефактов обработки (не используется).
         file_path: Путь к видеофайлу.
 
     Returns:
-        Список строк с транскрибированным содержанием видео.
+        Генератор чанков транскрибированного текста, упакованных по бюджету токенов.
     """
     transcribed_chunks = transcribe_media(file_path)
     if not transcribed_chunks or not isinstance(transcribed_chunks[0], str):
         print("Error: Transcription failed or returned non-text data")
         return ["Error: Video transcription failed"]
     
-    # Объединяем небольшие чанки
-    merged_chunks = merge_chunks(transcribed_chunks)
-    
-    return merged_chunks
+    # Упаковываем фрагменты транскрипции в чанки по бюджету токенов
+    return iter_chunks(transcribed_chunks)
@@ -6,29 +6,36 @@
 import os
 import time
 import math
-from pydub import AudioSegment
+import logging
 
-# Импорт библиотеки для загрузки переменных окружения из файла .env
-from dotenv import load_dotenv
-
-# Импорт внешних библиотек
-from openai import OpenAI
+# Импорт внутренних библиотек
+from back.config import MEDIA_CHUNK_DURATION_S, TRANSCRIBE_BACKEND
+from back.tools.media_segmenter import iter_media_chunks, max_chunk_duration, probe_duration
+from back.tools.transcribers import get_transcriber, record_throughput, throughput_summary
 # ============================
 # БЛОК НАСТРОЕК И ИНИЦИАЛИЗАЦИИ
 # ============================
-# Загрузка переменных окружения из файла .env
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-# Инициализация клиента OpenAI
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Сколько символов предыдущей транскрипции передается Whisper в качестве prompt
+WHISPER_PROMPT_CHARS = 500
 
-def transcribe_media(file_path: str) -> list[str]:
+# Максимальное число слов, которые могут повторяться из-за перекрытия соседних чанков
+OVERLAP_MAX_WORDS = 30
+
+def transcribe_media(file_path: str, chunk_duration_s: int = MEDIA_CHUNK_DURATION_S,
+                     backend: str = TRANSCRIBE_BACKEND) -> list[str]:
     """
     Description:
-        Транскрибирует аудио или видео файл на текст, разбивая на чанки по 5 минут.
+        Транскрибирует аудио или видео файл на текст, потоково разбивая его на чанки
+        без загрузки всего файла в память. Границы чанков привязаны к паузам в речи,
+        а длительность ограничена chunk_duration_s (и лимитом загрузки Whisper API для бэкенда 'openai').
+        Пропускная способность бэкенда (секунды аудио на секунду работы) выводится в лог.
 
     Args:
         file_path: Путь к аудио или видео файлу.
+        chunk_duration_s: Максимальная длительность чанка в секундах.
+        backend: Бэкенд распознавания ('openai' или 'faster_whisper').
 
     Returns:
         Список строк с транскрибированными текстовыми чанками медиа.
@@ -42,70 +49,59 @@ def transcribe_media(file_path: str) -> list[str]:
         ['Первый чанк текста', 'Второй чанк текста', ...]
     """
     try:
-        # Определяем, является ли файл видео по его расширению
-        is_video = file_path.lower().endswith(('.mp4', '.avi', '.mov'))
-        
-        # Загрузка аудио/видео файла
-        audio = AudioSegment.from_file(file_path)
-        
-        # Если это видео, конвертируем во временный аудио файл
-        if is_video:
-            temp_audio_path = "temp.mp3"
-            audio.export(temp_audio_path, format="mp3")
-        else:
-            temp_audio_path = file_path
-        
-        # Получаем длительность аудио в миллисекундах
-        duration_ms = len(audio)
-        
-        # Определяем длительность чанка в миллисекундах (5 минут)
-        chunk_duration_ms = (60 * 5) * 1000
-        chunks_count = math.ceil(duration_ms / chunk_duration_ms)
+        # Длительность нужна только для логирования прогресса, сам файл целиком не декодируется
+        transcriber = get_transcriber(backend)
+        duration_s = probe_duration(file_path)
+        effective_chunk_s = min(chunk_duration_s, max_chunk_duration()) if transcriber.needs_file else chunk_duration_s
+        chunks_count = math.ceil(duration_s / effective_chunk_s) if duration_s else None
         
         transcribed_chunks = []
-        print(f"🎬 Начинаем распознавание речи. Всего чанков: {chunks_count}")
-        print(f"⏱️ Общая длительность аудио: {duration_ms / 1000:.2f} секунд")
+        audio_s, wall_s = 0.0, 0.0
+        print(f"🎬 Начинаем распознавание речи ({transcriber.name}). Всего чанков: {chunks_count or '?'}")
+        if duration_s:
+            print(f"⏱️ Общая длительность аудио: {duration_s:.2f} секунд")
         print("-" * 50)
 
-        for i in range(chunks_count):
-            # Определяем начало и конец текущего чанка
-            start = i * chunk_duration_ms
-            end = min((i + 1) * chunk_duration_ms, duration_ms)
-            
-            print(f"🔄 Обработка чанка {i+1}/{chunks_count} ({(i+1)/chunks_count*100:.1f}%)")
-            print(f"🕒 Временной интервал: {start/1000:.2f}с - {end/1000:.2f}с")
+        # ffmpeg читает медиа потоково: в памяти находится только текущий чанк PCM.
+        # Для API каждый чанк кодируется в собственный уникальный временный mp3 файл,
+        # локальная модель получает PCM напрямую
+        chunks = iter_media_chunks(file_path, chunk_duration_s, encode=transcriber.needs_file)
+        for i, (start, end, audio) in enumerate(chunks):
+            progress = f" ({(i+1)/chunks_count*100:.1f}%)" if chunks_count else ""
+            print(f"🔄 Обработка чанка {i+1}/{chunks_count or '?'}{progress}")
+            print(f"🕒 Временной интервал: {start:.2f}с - {end:.2f}с")
             
-            # Извлекаем текущий чанк аудио
-            chunk = audio[start:end]
-            chunk_file = f"temp_chunk_{i}.mp3"
-            chunk.export(chunk_file, format="mp3")
-            
-            # Открываем файл чанка для чтения
-            with open(chunk_file, "rb") as audio_file:
-                # Пытаемся распознать текст для текущего чанка с помощью OpenAI API
-                try:
-                    transcription = client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_file, 
-                        response_format="text"
-                    )
-                    text = transcription
-                    transcribed_chunks.append(text)
-                    print(f"✅ Распознанный текст: {text[:50]}...")  # Показываем первые 50 символов
-                except Exception as e:
-                    error_message = f"Ошибка при распознавании речи: {str(e)}"
-                    print(f"❌ {error_message}")
-                    transcribed_chunks.append(f"Error during recognition: {str(e)}")
-            
-            # Удаляем временный файл чанка
-            os.remove(chunk_file)
+            # Пытаемся распознать текст для текущего чанка
+            try:
+                # Хвост предыдущего чанка передается как prompt, чтобы Whisper сохранял контекст на границе
+                previous_text = transcribed_chunks[-1] if transcribed_chunks and not transcribed_chunks[-1].startswith("Error") else ""
+                started = time.perf_counter()
+                transcription = transcriber.transcribe(audio, prompt=previous_text[-WHISPER_PROMPT_CHARS:])
+                elapsed = time.perf_counter() - started
+                audio_s += end - start
+                wall_s += elapsed
+                record_throughput(transcriber.name, end - start, elapsed)
+
+                text = strip_overlap(previous_text, transcription)
+                transcribed_chunks.append(text)
+                print(f"✅ Распознанный текст: {text[:50]}...")  # Показываем первые 50 символов
+                print(f"⚡ Скорость: {(end - start) / max(elapsed, 1e-9):.1f} с аудио / с")
+            except Exception as e:
+                error_message = f"Ошибка при распознавании речи: {str(e)}"
+                print(f"❌ {error_message}")
+                transcribed_chunks.append(f"Error during recognition: {str(e)}")
             
             print("-" * 50)
 
-            # Добавляем задержку между запросами
-            time.sleep(1)
+            # Добавляем задержку между запросами (для внешнего API)
+            if transcriber.request_delay_s:
+                time.sleep(transcriber.request_delay_s)
 
-        print(f"🏁 Распознавание завершено. Обработано {chunks_count} чанков.")
+        print(f"🏁 Распознавание завершено. Обработано {len(transcribed_chunks)} чанков.")
+        if wall_s:
+            print(f"⚡ Пропускная способность {transcriber.name}: {audio_s / wall_s:.1f} с аудио / с "
+                  f"({audio_s:.0f} с аудио за {wall_s:.1f} с)")
+        logger.info("Transcription throughput by backend: %s", throughput_summary())
         print(f"📊 Общее количество распознанных фрагментов: {len([chunk for chunk in transcribed_chunks if chunk])}")
 
         # Объединяем все чанки и сохраняем результат
@@ -113,68 +109,46 @@ def transcribe_media(file_path: str) -> list[str]:
         saved_path = save_transcription(final_text, file_path)
         print(f"💾 Транскрипция сохранена в файл: {saved_path}")
         
-        # Удаляем временный аудио файл, если он был создан
-        if is_video and os.path.exists(temp_audio_path):
-            os.remove(temp_audio_path)
-        
         return transcribed_chunks
     except Exception as e:
         # Обрабатываем общие исключения и возвращаем сообщение об ошибке
         print(f"🚫 Ошибка в функции transcribe_media: {str(e)}")
         return [f"Error during transcription: {str(e)}"]
 
-def merge_chunks(chunks: list[str], min_chunk_length: int = 100, max_chunk_length: int = 1000) -> list[str]:
+def strip_overlap(previous: str, current: str, max_words: int = OVERLAP_MAX_WORDS, min_words: int = 2) -> str:
     """
     Description:
-        Объединяет небольшие чанки текста в более крупные.
+        Удаляет из начала текущей транскрипции слова, повторяющие конец предыдущей.
+        Повтор возникает из-за перекрытия соседних аудио чанков. Совпадение короче min_words
+        слов не считается повтором: одно частое слово («и», «the») может совпасть случайно.
 
     Args:
-        chunks: Список строк с текстовыми чанками.
-        min_chunk_length: Минимальная длина чанка (в символах) для объединения.
-        max_chunk_length: Максимальная длина объединенного чанка.
+        previous: Транскрипция предыдущего чанка.
+        current: Транскрипция текущего чанка.
+        max_words: Максимальная длина проверяемого повтора в словах.
+        min_words: Минимальная длина повтора в словах.
 
     Returns:
-        Список объединенных чанков.
-    
-    Raises:
-        None
-    
+        Текущая транскрипция без повторяющегося префикса.
+
     Examples:
-        >>> merge_chunks(['Короткий чанк', 'Еще один короткий', 'Длинный чанк текста'])
-        ['Короткий чанк Еще один короткий', 'Длинный чанк текста']
+        >>> strip_overlap('мы начинаем лекцию', 'начинаем лекцию о трансформерах')
+        'о трансформерах'
+        >>> strip_overlap('мы говорим о том и', 'и это важно')
+        'и это важно'
     """
-    # Инициализируем список для хранения объединенных чанков
-    merged_chunks = []
-    # Инициализируем переменную для текущего объединяемого чанка
-    current_chunk = ""
-
-    # Проходим по всем чанкам в исходном списке
-    for chunk in chunks:
-        # Проверяем, не превысит ли длина текущего чанка максимально допустимую при добавлении нового
-        if len(current_chunk) + len(chunk) <= max_chunk_length:
-            # Если не превысит, добавляем новый чанк к текущему
-            current_chunk += " " + chunk if current_chunk else chunk
-        else:
-            # Если превысит, добавляем текущий чанк в список объединенных (если он не пустой)
-            if current_chunk:
-                merged_chunks.append(current_chunk)
-            # И начинаем новый текущий чанк
-            current_chunk = chunk
-
-        # Проверяем, достиг ли текущий чанк минимальной длины
-        if len(current_chunk) >= min_chunk_length:
-            # Если достиг, добавляем его в список объединенных
-            merged_chunks.append(current_chunk)
-            # И очищаем текущий чанк
-            current_chunk = ""
-
-    # После обработки всех чанков проверяем, остался ли непустой текущий чанк
-    if current_chunk:
-        # Если остался, добавляем его в список объединенных
-        merged_chunks.append(current_chunk)
-
-    # Возвращаем список объединенных чанков
-    return merged_chunks
+    def normalize(word: str) -> str:
+        return word.strip('.,!?;:…"«»()').lower()
+
+    previous_tail = [normalize(word) for word in previous.split()[-max_words:]]
+    current_words = current.split()
+    current_head = [normalize(word) for word in current_words[:max_words]]
+
+    # Ищем самый длинный суффикс предыдущего текста, совпадающий с префиксом текущего
+    for size in range(min(len(previous_tail), len(current_head)), min_words - 1, -1):
+        if previous_tail[-size:] == current_head[:size]:
+            return " ".join(current_words[size:])
+    return current
 
 def save_transcription(text: str, path: str) -> str:
     """
@@ -0,0 +1,239 @@
+# back/tools/transcribers.py
+# ============================
+# БЛОК ИМПОРТОВ
+# ============================
+# Импорт стандартных библиотек
+import os
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+
+# Импорт аннотаций типов
+from typing import Dict, Union
+
+# Импорт внешних библиотек
+import numpy as np
+
+# Импорт внутренних библиотек
+from back.config import (
+    TRANSCRIBE_BACKEND,
+    WHISPER_LOCAL_MODEL,
+    WHISPER_LOCAL_DEVICE,
+    WHISPER_LOCAL_COMPUTE_TYPE,
+    WHISPER_LOCAL_CPU_THREADS,
+    WHISPER_LOCAL_BATCH_SIZE,
+    WHISPER_VAD_FILTER,
+    WHISPER_LANGUAGE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Transcriber(ABC):
+    """
+    Description:
+        Базовый класс бэкенда распознавания речи.
+        Бэкенд с needs_file=True получает путь к mp3 чанку (для загрузки в API),
+        иначе — массив PCM float32 16 кГц моно.
+    """
+    name = 'base'
+    needs_file = True
+    # Пауза между запросами (для соблюдения лимитов внешнего API)
+    request_delay_s = 0.0
+
+    @abstractmethod
+    def transcribe(self, audio: Union[str, np.ndarray], prompt: str = "") -> str:
+        """
+        Description:
+            Распознает речь в чанке.
+
+        Args:
+            audio: Путь к mp3 чанку или массив PCM float32.
+            prompt: Текст, предшествующий чанку (помогает сохранить контекст на границе).
+
+        Returns:
+            Распознанный текст.
+        """
+
+
+class OpenAIWhisperTranscriber(Transcriber):
+    """
+    Description:
+        Распознавание через Whisper API (модель whisper-1).
+    """
+    name = 'openai'
+    needs_file = True
+    request_delay_s = 1.0
+
+    def __init__(self, model: str = 'whisper-1'):
+        """
+        Description:
+            Создает клиент OpenAI.
+
+        Args:
+            model: Имя модели распознавания.
+        """
+        from openai import OpenAI
+        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.model = model
+
+    def transcribe(self, audio: str, prompt: str = "") -> str:
+        """
+        Description:
+            Загружает mp3 чанк в Whisper API и возвращает распознанный текст.
+
+        Args:
+            audio: Путь к mp3 чанку.
+            prompt: Хвост предыдущей транскрипции.
+
+        Returns:
+            Распознанный текст.
+        """
+        with open(audio, "rb") as audio_file:
+            return self.client.audio.transcriptions.create(
+                model=self.model,
+                file=audio_file,
+                response_format="text",
+                prompt=prompt
+            )
+
+
+class FasterWhisperTranscriber(Transcriber):
+    """
+    Description:
+        Локальное распознавание моделью faster-whisper (CTranslate2) на CPU с квантизацией int8.
+        Речевые сегменты выделяются VAD фильтром и распознаются пакетами (BatchedInferencePipeline),
+        если установленная версия faster-whisper его поддерживает. Без VAD фильтра пакетному распознаванию
+        не на что делить чанк длиннее 30 с, поэтому он распознается последовательно (WhisperModel.transcribe).
+    """
+    name = 'faster_whisper'
+    needs_file = False
+
+    def __init__(self, model_size: str = WHISPER_LOCAL_MODEL, device: str = WHISPER_LOCAL_DEVICE,
+                 compute_type: str = WHISPER_LOCAL_COMPUTE_TYPE, cpu_threads: int = WHISPER_LOCAL_CPU_THREADS,
+                 batch_size: int = WHISPER_LOCAL_BATCH_SIZE, vad_filter: bool = WHISPER_VAD_FILTER,
+                 language: str = WHISPER_LANGUAGE):
+        """
+        Description:
+            Загружает модель (выполняется один раз на процесс, см. get_transcriber).
+
+        Args:
+            model_size: Размер модели или путь к сконвертированной модели.
+            device: Устройство ('cpu' или 'cuda').
+            compute_type: Тип вычислений (например, 'int8').
+            cpu_threads: Количество потоков CPU (0 — по умолчанию).
+            batch_size: Количество сегментов в одном пакете.
+            vad_filter: Удалять ли тишину перед распознаванием.
+            language: Язык речи или None для автоопределения.
+
+        Raises:
+            ImportError: Если пакет faster-whisper не установлен.
+        """
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError("TRANSCRIBE_BACKEND=faster_whisper requires `pip install faster-whisper`") from e
+
+        self.model = WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+        self.batch_size = batch_size
+        self.vad_filter = vad_filter
+        self.language = language
+
+        try:
+            from faster_whisper import BatchedInferencePipeline
+            self.pipeline = BatchedInferencePipeline(model=self.model)
+        except ImportError:
+            logger.warning("faster-whisper without BatchedInferencePipeline, segments are decoded sequentially")
+            self.pipeline = None
+
+    def transcribe(self, audio: np.ndarray, prompt: str = "") -> str:
+        """
+        Description:
+            Распознает чанк PCM локальной моделью.
+
+        Args:
+            audio: Массив PCM float32 16 кГц моно.
+            prompt: Хвост предыдущей транскрипции (initial_prompt модели).
+
+        Returns:
+            Распознанный текст.
+        """
+        if self.pipeline is not None and self.vad_filter:
+            segments, _ = self.pipeline.transcribe(
+                audio, batch_size=self.batch_size, vad_filter=self.vad_filter,
+                language=self.language, initial_prompt=prompt or None
+            )
+        else:
+            segments, _ = self.model.transcribe(
+                audio, vad_filter=self.vad_filter, language=self.language, initial_prompt=prompt or None
+            )
+        return " ".join(segment.text.strip() for segment in segments)
+
+
+# Доступные бэкенды распознавания
+BACKENDS = {
+    OpenAIWhisperTranscriber.name: OpenAIWhisperTranscriber,
+    FasterWhisperTranscriber.name: FasterWhisperTranscriber,
+}
+
+# Загруженные бэкенды (модель загружается один раз на процесс)
+_transcribers: Dict[str, Transcriber] = {}
+_transcribers_lock = threading.Lock()
+
+# Накопительная статистика: бэкенд -> секунды аудио и секунды работы
+_throughput: Dict[str, Dict[str, float]] = defaultdict(lambda: {'audio_s': 0.0, 'wall_s': 0.0})
+_throughput_lock = threading.Lock()
+
+
+def get_transcriber(backend: str = TRANSCRIBE_BACKEND) -> Transcriber:
+    """
+    Description:
+        Возвращает бэкенд распознавания, создавая его при первом обращении.
+
+    Args:
+        backend: Имя бэкенда ('openai' или 'faster_whisper').
+
+    Returns:
+        Transcriber: Бэкенд распознавания.
+
+    Raises:
+        ValueError: Если бэкенд неизвестен.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown transcription backend: {backend}")
+    with _transcribers_lock:
+        if backend not in _transcribers:
+            _transcribers[backend] = BACKENDS[backend]()
+        return _transcribers[backend]
+
+
+def record_throughput(backend: str, audio_s: float, wall_s: float) -> None:
+    """
+    Description:
+        Учитывает распознанный фрагмент в статистике пропускной способности бэкенда.
+
+    Args:
+        backend: Имя бэкенда.
+        audio_s: Длительность распознанного аудио в секундах.
+        wall_s: Время распознавания в секундах.
+    """
+    with _throughput_lock:
+        _throughput[backend]['audio_s'] += audio_s
+        _throughput[backend]['wall_s'] += wall_s
+
+
+def throughput_summary() -> Dict[str, Dict[str, float]]:
+    """
+    Description:
+        Возвращает пропускную способность каждого использованного бэкенда.
+
+    Returns:
+        Словарь бэкенд -> {'audio_s', 'wall_s', 'realtime_factor'}, где realtime_factor —
+        секунды аудио на секунду работы.
+    """
+    with _throughput_lock:
+        return {
+            backend: {**stats, 'realtime_factor': stats['audio_s'] / stats['wall_s'] if stats['wall_s'] else 0.0}
+            for backend, stats in _throughput.items()
+        }
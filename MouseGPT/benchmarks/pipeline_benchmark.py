@@ -0,0 +1,568 @@
+# benchmarks/pipeline_benchmark.py
+"""
+Сквозной бенчмарк конвейера обработки файлов MouseGPT.
+
+Запускает process_file для сгенерированных PDF, Jupyter Notebook и аудио файлов разного размера.
+Вызовы OpenAI заменены локальными заглушками с настраиваемой задержкой и размером ответа,
+поэтому результат зависит только от кода конвейера. Для каждого случая выводится время этапов,
+количество вызовов LLM, отправленные и полученные токены и пиковый RSS процесса.
+
+Запуск из директории MouseGPT:
+    python -m benchmarks.pipeline_benchmark --kinds pdf,ipynb --sizes small,medium
+    python -m benchmarks.pipeline_benchmark --llm-latency-ms 0 --json results.json
+
+Каждый случай выполняется в отдельном процессе, чтобы пиковый RSS относился только к нему.
+Аудио случаи требуют ffmpeg и пропускаются, если он не найден.
+"""
+# ============================
+# БЛОК ИМПОРТОВ
+# ============================
+# Импорт стандартных библиотек
+import os
+import sys
+import json
+import time
+import wave
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from types import SimpleNamespace
+
+# Импорт аннотаций типов
+from typing import Any, Dict, List, Optional
+
+# Настройки приложения читаются при импорте back.config, поэтому заглушки включаются до импорта
+os.environ.setdefault('EMBEDDING_BACKEND', 'hash')
+os.environ.setdefault('EMBEDDING_CACHE_PATH', '')
+os.environ.setdefault('LLM_CACHE_PATH', '')
+os.environ.setdefault('TRANSCRIBE_BACKEND', 'benchmark')
+os.environ.setdefault('LANGCHAIN_TRACING_V2', 'false')
+
+# Импорт внешних библиотек
+import numpy as np
+
+# Директория MouseGPT (для импорта back при запуске файла напрямую)
+ROOT_DIRECTORY = Path(__file__).resolve().parent.parent
+if str(ROOT_DIRECTORY) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIRECTORY))
+
+# Размеры входных данных: страницы PDF, ячейки ноутбука, секунды аудио
+SIZES = {
+    'small':  {'pdf': 10,  'ipynb': 40,   'audio': 60},
+    'medium': {'pdf': 50,  'ipynb': 200,  'audio': 600},
+    'large':  {'pdf': 200, 'ipynb': 1000, 'audio': 3600},
+}
+
+# Словарь для генерации текста
+WORDS = ("model data training layer network gradient loss batch feature vector matrix attention token "
+         "embedding sequence decoder encoder learning rate optimizer weight bias activation dropout "
+         "regularization inference evaluation metric accuracy precision recall dataset sample").split()
+
+
+# ============================
+# ЗАГЛУШКИ ВНЕШНИХ СЕРВИСОВ
+# ============================
+class FakeLLM:
+    """
+    Description:
+        Заглушка клиента OpenAI (llm.chat.completions.create) с настраиваемой задержкой
+        и размером ответа. Считает вызовы, отправленные и полученные токены.
+    """
+
+    def __init__(self, latency_s: float, output_tokens: int, s_per_token: float = 0.0):
+        """
+        Description:
+            Инициализация заглушки.
+
+        Args:
+            latency_s: Задержка ответа (время до первого токена).
+            output_tokens: Количество токенов в ответе.
+            s_per_token: Время генерации одного токена ответа.
+        """
+        self.latency_s = latency_s
+        self.output_tokens = output_tokens
+        self.s_per_token = s_per_token
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.wall_s = 0.0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model: str, messages: List[Dict[str, Any]], **params) -> Any:
+        """
+        Description:
+            Имитирует chat.completions.create.
+
+        Args:
+            model: Имя модели.
+            messages: Сообщения запроса.
+            **params: Параметры генерации.
+
+        Returns:
+            Объект с полем choices[0].message.content.
+        """
+        from back.tokens import count_tokens
+
+        started = time.perf_counter()
+        prompt_tokens = sum(count_tokens(message['content'], model) for message in messages)
+        rng = random.Random(prompt_tokens)
+        content = " ".join(rng.choice(WORDS) for _ in range(self.output_tokens))
+        time.sleep(self.latency_s + self.s_per_token * self.output_tokens)
+
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += self.output_tokens
+            self.wall_s += time.perf_counter() - started
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def make_fake_embeddings(latency_s: float) -> Any:
+    """
+    Description:
+        Создает заглушку эмбеддингов: детерминированные HashEmbeddings с задержкой на каждый запрос.
+
+    Args:
+        latency_s: Задержка одного запроса к API эмбеддингов.
+
+    Returns:
+        Заглушка эмбеддингов со счетчиками запросов и текстов.
+    """
+    from back.embeddings import HashEmbeddings
+
+    class FakeEmbeddings(HashEmbeddings):
+        calls = 0
+        texts = 0
+
+        def embed_documents(self, texts: List[str]) -> List[List[float]]:
+            time.sleep(latency_s)
+            FakeEmbeddings.calls += 1
+            FakeEmbeddings.texts += len(texts)
+            return super().embed_documents(texts)
+
+    return FakeEmbeddings()
+
+
+def make_fake_transcriber(realtime_factor: float) -> Any:
+    """
+    Description:
+        Создает класс заглушки бэкенда распознавания речи.
+
+    Args:
+        realtime_factor: Секунды аудио, распознаваемые за секунду работы.
+
+    Returns:
+        Класс бэкенда, совместимый с back.tools.transcribers.Transcriber.
+    """
+    from back.config import MEDIA_SAMPLE_RATE
+    from back.tools.transcribers import Transcriber
+
+    class FakeTranscriber(Transcriber):
+        name = 'benchmark'
+        needs_file = False
+
+        def transcribe(self, audio: np.ndarray, prompt: str = "") -> str:
+            duration_s = len(audio) / MEDIA_SAMPLE_RATE
+            time.sleep(duration_s / realtime_factor)
+            rng = random.Random(len(audio))
+            # Примерно 2.5 слова в секунду речи
+            return " ".join(rng.choice(WORDS) for _ in range(int(duration_s * 2.5)))
+
+    return FakeTranscriber
+
+
+class StageRecorder:
+    """
+    Description:
+        Заменяет контекст фоновой задачи (JobContext) и фиксирует время перехода между этапами process_file.
+    """
+
+    def __init__(self):
+        """
+        Description:
+            Инициализация записи этапов.
+        """
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self._current: Optional[str] = None
+        self._since = self.started
+
+    def progress(self, stage: str, current: int = 0, total: int = 0, message: str = "") -> None:
+        """
+        Description:
+            Фиксирует переход к этапу (сигнатура совпадает с JobContext.progress).
+
+        Args:
+            stage: Этап обработки.
+        """
+        if stage != self._current:
+            self._close()
+            self._current = stage
+
+    def check_cancelled(self) -> None:
+        """
+        Description:
+            Задачи бенчмарка не отменяются.
+        """
+
+    def _close(self) -> None:
+        """
+        Description:
+            Добавляет время, прошедшее с начала текущего этапа, к его сумме.
+        """
+        now = time.perf_counter()
+        if self._current is not None:
+            self.stages[self._current] = self.stages.get(self._current, 0.0) + now - self._since
+        self._since = now
+
+    def finish(self) -> Dict[str, float]:
+        """
+        Description:
+            Завершает текущий этап.
+
+        Returns:
+            Время этапов в секундах.
+        """
+        self._close()
+        self._current = None
+        return self.stages
+
+
+# ============================
+# ГЕНЕРАЦИЯ ВХОДНЫХ ДАННЫХ
+# ============================
+def generate_text(rng: random.Random, words: int) -> str:
+    """
+    Description:
+        Генерирует псевдотекст из предложений по 8-16 слов.
+    """
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(8, 16))
+        sentence = " ".join(rng.choice(WORDS) for _ in range(length))
+        sentences.append(sentence.capitalize() + ".")
+        words -= length
+    return " ".join(sentences)
+
+
+def generate_pdf(path: Path, pages: int, words_per_page: int = 350, seed: int = 0) -> None:
+    """
+    Description:
+        Создает PDF файл с текстовыми страницами. Каждая пятая страница начинается с заголовка раздела.
+        Файл собирается вручную (стандартный шрифт Helvetica), сторонние библиотеки не нужны.
+
+    Args:
+        path: Путь к создаваемому файлу.
+        pages: Количество страниц.
+        words_per_page: Количество слов на странице.
+        seed: Зерно генератора текста.
+    """
+    rng = random.Random(seed)
+    texts = []
+    for i in range(pages):
+        text = generate_text(rng, words_per_page)
+        if i % 5 == 0:
+            text = f"{i // 5 + 1}. Section {i // 5 + 1} " + text
+        texts.append(text)
+
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(pages))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    font_id = 3 + 2 * pages
+    for i, text in enumerate(texts):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>".encode()
+        )
+        escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        lines = [escaped[j:j + 90] for j in range(0, len(escaped), 90)]
+        stream = ("BT /F1 10 Tf 40 750 Td 12 TL " + " ".join(f"({line}) Tj T*" for line in lines) + " ET").encode()
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    output = b"%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += f"{i} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    output += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(output)
+
+
+def generate_notebook(path: Path, cells: int, seed: int = 0) -> None:
+    """
+    Description:
+        Создает Jupyter Notebook с чередующимися ячейками Markdown и кода.
+
+    Args:
+        path: Путь к создаваемому файлу.
+        cells: Количество ячеек.
+        seed: Зерно генератора текста.
+    """
+    import nbformat
+
+    rng = random.Random(seed)
+    notebook = nbformat.v4.new_notebook()
+    for i in range(cells):
+        if i % 2 == 0:
+            heading = f"## Step {i // 2 + 1}\n" if i % 10 == 0 else ""
+            notebook.cells.append(nbformat.v4.new_markdown_cell(heading + generate_text(rng, 60)))
+        else:
+            lines = [f"{rng.choice(WORDS)}_{j} = {rng.choice(WORDS)}({rng.randint(0, 100)})" for j in range(12)]
+            notebook.cells.append(nbformat.v4.new_code_cell("\n".join(lines)))
+    nbformat.write(notebook, str(path))
+
+
+def generate_audio(path: Path, duration_s: int, sample_rate: int = 16000, seed: int = 0) -> None:
+    """
+    Description:
+        Создает WAV файл из тональных «фраз» длиной 2-8 секунд, разделенных паузами,
+        чтобы нарезка чанков по тишине работала как на речи. Файл пишется блоками.
+
+    Args:
+        path: Путь к создаваемому файлу.
+        duration_s: Длительность в секундах.
+        sample_rate: Частота дискретизации.
+        seed: Зерно генератора.
+    """
+    rng = random.Random(seed)
+    with wave.open(str(path), 'wb') as output:
+        output.setnchannels(1)
+        output.setsampwidth(2)
+        output.setframerate(sample_rate)
+        written = 0
+        total = duration_s * sample_rate
+        while written < total:
+            phrase = min(int(rng.uniform(2, 8) * sample_rate), total - written)
+            t = np.arange(phrase) / sample_rate
+            envelope = np.sin(np.pi * np.linspace(0, 1, phrase))
+            tone = 0.3 * np.sin(2 * np.pi * rng.uniform(120, 300) * t) * envelope
+            pause = min(int(rng.uniform(0.3, 1.0) * sample_rate), total - written - phrase)
+            samples = np.concatenate([tone, np.zeros(pause)])
+            output.writeframes((samples * 32767).astype(np.int16).tobytes())
+            written += phrase + pause
+
+
+# ============================
+# ЗАПУСК СЛУЧАЕВ
+# ============================
+def peak_rss_mb() -> Optional[float]:
+    """
+    Description:
+        Возвращает пиковый RSS текущего процесса в мегабайтах.
+
+    Returns:
+        Пиковый RSS или None, если платформа его не предоставляет.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux возвращает килобайты, macOS — байты
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(kind: str, size: str, input_path: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Description:
+        Выполняет process_file для одного входного файла с заглушками внешних сервисов.
+
+    Args:
+        kind: Тип файла ('pdf', 'ipynb' или 'audio').
+        size: Имя размера из SIZES.
+        input_path: Путь к входному файлу.
+        options: Параметры заглушек (см. аргументы командной строки).
+
+    Returns:
+        Метрики случая.
+    """
+    import back.embeddings as embeddings_module
+    from back.embeddings import CachedEmbeddings
+    from back.file_manager import FileManager
+    from back.tools import transcribers
+    from back.tools.transcribe_media import transcribe_media
+    from back.tools.process_file import process_file, process_pdf_file, process_ipynb_file
+    from back.chunking import iter_chunks
+
+    fake_embeddings = make_fake_embeddings(options['embed_latency_ms'] / 1000)
+    embeddings_module._embeddings = CachedEmbeddings(fake_embeddings, 'benchmark')
+    transcribers.BACKENDS['benchmark'] = make_fake_transcriber(options['transcribe_rtf'])
+    llm = FakeLLM(options['llm_latency_ms'] / 1000, options['llm_output_tokens'], options['llm_ms_per_token'] / 1000)
+
+    from back.agent import BaseAgent
+    agent = BaseAgent(llm, "You are a helpful assistant that summarizes documents.")
+
+    working_directory = Path(options['work_dir']) / f"{kind}-{size}"
+    shutil.rmtree(working_directory, ignore_errors=True)
+    shutil.copytree(ROOT_DIRECTORY / 'temp' / 'prompts', working_directory / 'prompts')
+    file_manager = FileManager(str(working_directory))
+    case_path = working_directory / Path(input_path).name
+    shutil.copy(input_path, case_path)
+
+    audio_s = 0.0
+
+    def process_audio(file_manager, artifacts, file_path):
+        return iter_chunks(transcribe_media(file_path, backend='benchmark'))
+
+    processors = {'pdf': process_pdf_file, 'ipynb': process_ipynb_file, 'audio': process_audio}
+
+    recorder = StageRecorder()
+    started = time.perf_counter()
+    result = process_file(str(case_path), agent, file_manager, processors[kind], 'text', job=recorder)
+    total_s = time.perf_counter() - started
+    stages = recorder.finish()
+
+    if kind == 'audio':
+        audio_s = transcribers.throughput_summary().get('benchmark', {}).get('audio_s', 0.0)
+
+    return {
+        'kind': kind,
+        'size': size,
+        'input_mb': os.path.getsize(input_path) / (1024 * 1024),
+        'chunks': result['chunks'],
+        'llm_calls': llm.calls,
+        'prompt_tokens': llm.prompt_tokens,
+        'completion_tokens': llm.completion_tokens,
+        'llm_wall_s': llm.wall_s,
+        'embedding_calls': type(fake_embeddings).calls,
+        'embedded_texts': type(fake_embeddings).texts,
+        'audio_s': audio_s,
+        'stages_s': stages,
+        'total_s': total_s,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def prepare_inputs(kinds: List[str], sizes: List[str], directory: Path) -> List[Dict[str, str]]:
+    """
+    Description:
+        Генерирует входные файлы для всех сочетаний типа и размера.
+
+    Args:
+        kinds: Типы файлов.
+        sizes: Имена размеров.
+        directory: Директория для входных файлов.
+
+    Returns:
+        Список случаев с полями 'kind', 'size' и 'path'.
+    """
+    from back.config import FFMPEG_BINARY
+
+    generators = {'pdf': (generate_pdf, 'pdf'), 'ipynb': (generate_notebook, 'ipynb'), 'audio': (generate_audio, 'wav')}
+    cases = []
+    for kind in kinds:
+        if kind == 'audio' and not shutil.which(FFMPEG_BINARY):
+            print(f"⚠️ {FFMPEG_BINARY} не найден, аудио случаи пропущены")
+            continue
+        generate, extension = generators[kind]
+        for size in sizes:
+            path = directory / f"{kind}_{size}.{extension}"
+            if not path.exists():
+                generate(path, SIZES[size][kind])
+            cases.append({'kind': kind, 'size': size, 'path': str(path)})
+    return cases
+
+
+def format_report(results: List[Dict[str, Any]]) -> str:
+    """
+    Description:
+        Форматирует результаты в текстовую таблицу.
+
+    Args:
+        results: Метрики случаев.
+
+    Returns:
+        Таблица результатов.
+    """
+    header = ("case", "MB", "chunks", "calls", "tok_in", "tok_out", "emb", "extract_s", "summarize_s",
+              "final_s", "llm_s", "total_s", "rss_MB")
+    rows = [header]
+    for r in results:
+        stages = r['stages_s']
+        rows.append((
+            f"{r['kind']}/{r['size']}", f"{r['input_mb']:.2f}", r['chunks'], r['llm_calls'], r['prompt_tokens'],
+            r['completion_tokens'], r['embedding_calls'], f"{stages.get('extract', 0):.2f}",
+            f"{stages.get('summarize', 0):.2f}", f"{stages.get('final', 0):.2f}", f"{r['llm_wall_s']:.2f}",
+            f"{r['total_s']:.2f}", f"{r['peak_rss_mb']:.0f}" if r['peak_rss_mb'] else "-",
+        ))
+    widths = [max(len(str(row[i])) for row in rows) for i in range(len(header))]
+    return "\n".join("  ".join(str(value).rjust(width) for value, width in zip(row, widths)) for row in rows)
+
+
+def main(argv: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Description:
+        Точка входа бенчмарка.
+
+    Args:
+        argv: Аргументы командной строки.
+
+    Returns:
+        Метрики всех случаев.
+    """
+    parser = argparse.ArgumentParser(description="MouseGPT pipeline benchmark with local stand-ins for OpenAI")
+    parser.add_argument('--kinds', default='pdf,ipynb,audio', help="pdf, ipynb, audio через запятую")
+    parser.add_argument('--sizes', default='small,medium', help=f"{', '.join(SIZES)} через запятую")
+    parser.add_argument('--llm-latency-ms', type=float, default=200, help="задержка ответа LLM")
+    parser.add_argument('--llm-ms-per-token', type=float, default=0, help="время генерации токена ответа")
+    parser.add_argument('--llm-output-tokens', type=int, default=150, help="токенов в ответе LLM")
+    parser.add_argument('--embed-latency-ms', type=float, default=50, help="задержка запроса эмбеддингов")
+    parser.add_argument('--transcribe-rtf', type=float, default=20, help="секунд аудио на секунду распознавания")
+    parser.add_argument('--work-dir', default=None, help="директория входных файлов и результатов")
+    parser.add_argument('--in-process', action='store_true', help="выполнять случаи в текущем процессе")
+    parser.add_argument('--json', default=None, help="путь для сохранения результатов в JSON")
+    args = parser.parse_args(argv)
+
+    kinds = [kind for kind in args.kinds.split(',') if kind]
+    sizes = [size for size in args.sizes.split(',') if size]
+    unknown = [value for value in kinds if value not in ('pdf', 'ipynb', 'audio')] + \
+              [value for value in sizes if value not in SIZES]
+    if unknown:
+        parser.error(f"unknown kinds or sizes: {unknown}")
+
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix='mousegpt-bench-'))
+    inputs_dir = work_dir / 'inputs'
+    inputs_dir.mkdir(parents=True, exist_ok=True)
+    options = {
+        'llm_latency_ms': args.llm_latency_ms,
+        'llm_ms_per_token': args.llm_ms_per_token,
+        'llm_output_tokens': args.llm_output_tokens,
+        'embed_latency_ms': args.embed_latency_ms,
+        'transcribe_rtf': args.transcribe_rtf,
+        'work_dir': str(work_dir / 'runs'),
+    }
+
+    print(f"📂 Рабочая директория бенчмарка: {work_dir}")
+    cases = prepare_inputs(kinds, sizes, inputs_dir)
+
+    results = []
+    for case in cases:
+        print(f"🏁 {case['kind']}/{case['size']}")
+        if args.in_process:
+            results.append(run_case(case['kind'], case['size'], case['path'], options))
+        else:
+            # Отдельный процесс на случай: пиковый RSS не накапливается между случаями
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                results.append(executor.submit(run_case, case['kind'], case['size'], case['path'], options).result())
+
+    print()
+    print(format_report(results))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"💾 Результаты сохранены в {args.json}")
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -3,11 +3,14 @@ const socket = io.connect({
     transports: ['websocket', 'polling']
 });
 
+// Идентификатор последней фоновой задачи обработки файла
+let currentJobId = null;
+
 document.getElementById('send-button').addEventListener('click', () => {
     const userInput = document.getElementById('user-input').value;
     if (userInput) {
         appendMessage('You', userInput, 'user-message');
-        socket.emit('message', { message: userInput });
+        socket.emit('message', { message: userInput, job_id: currentJobId });
         document.getElementById('user-input').value = '';
     }
 });
@@ -16,6 +19,39 @@ socket.on('response', (data) => {
     appendMessage('Nia', data.message, 'bot-message');
 });
 
+// Потоковый ответ: сообщение создается с первым токеном и дополняется по мере генерации
+function streamMessageElement(streamId) {
+    let element = document.querySelector(`[data-stream-id="${streamId}"] .message`);
+    if (!element) {
+        appendMessage('Nia', '', 'bot-message');
+        const chatBox = document.getElementById('chat-box');
+        chatBox.lastElementChild.dataset.streamId = streamId;
+        element = chatBox.lastElementChild.querySelector('.message');
+    }
+    return element;
+}
+
+socket.on('response_token', (data) => {
+    const element = streamMessageElement(data.stream_id);
+    element.textContent += data.token;
+    const chatBox = document.getElementById('chat-box');
+    chatBox.scrollTop = chatBox.scrollHeight;
+});
+
+socket.on('response_end', (data) => {
+    const element = streamMessageElement(data.stream_id);
+    element.textContent = data.message;
+    if (data.sources && data.sources.length) {
+        const pages = data.sources
+            .map(source => source.page ? `${source.source}, p. ${source.page}` : source.source)
+            .join('; ');
+        const sourcesElement = document.createElement('p');
+        sourcesElement.className = 'message sources';
+        sourcesElement.textContent = `Sources: ${pages}`;
+        element.parentElement.appendChild(sourcesElement);
+    }
+});
+
 function appendMessage(sender, message, className) {
     const chatBox = document.getElementById('chat-box');
     const messageElement = document.createElement('div');
@@ -76,18 +112,57 @@ function processFile() {
         method: 'POST',
         body: formData
     })
-    .then(response => response.text())
-    .then(data => {
-        document.getElementById('chat-box').innerHTML += `<div class="chatbox__messages__user-message--ind-message bot-message"><p class="name">Bot:</p><p class="message">${data}</p></div>`;
-        uploadFileButton.querySelector('span').textContent = 'Download';
+    .then(response => {
+        if (!response.ok) {
+            return response.text().then(text => { throw new Error(text); });
+        }
+        return response.json();
+    })
+    .then(job => {
+        // Подписываемся на события прогресса задачи
+        currentJobId = job.job_id;
+        socket.emit('subscribe_job', { job_id: job.job_id });
     })
-    .catch(error => console.error('Error:', error))
-    .finally(() => {
-        spinner.style.display = 'none';
-        uploadFileButton.disabled = false;
+    .catch(error => {
+        console.error('Error:', error);
+        appendMessage('Bot', error.message, 'bot-message');
+        finishProcessing('Upload File');
     });
 }
 
+function finishProcessing(buttonText) {
+    spinner.style.display = 'none';
+    uploadFileButton.disabled = false;
+    uploadFileButton.querySelector('span').textContent = buttonText;
+}
+
+socket.on('job_progress', (job) => {
+    if (job.job_id !== currentJobId || !job.progress) {
+        return;
+    }
+    const { stage, current, total } = job.progress;
+    let label = `Processing (${stage})`;
+    if (total) {
+        label = `Processing ${current}/${total}`;
+    } else if (current) {
+        label = `Processing chunk ${current}`;
+    }
+    uploadFileButton.querySelector('span').textContent = label;
+});
+
+socket.on('job_done', (job) => {
+    if (job.job_id !== currentJobId) {
+        return;
+    }
+    if (job.state === 'completed') {
+        appendMessage('Bot', job.result.final_summary, 'bot-message');
+        finishProcessing('Download');
+    } else {
+        appendMessage('Bot', job.error || `Processing ${job.state}`, 'bot-message');
+        finishProcessing('Upload File');
+    }
+});
+
 function downloadSummary() {
-    window.location.href = '/download_summary';
+    window.location.href = `/download_summary?job_id=${encodeURIComponent(currentJobId)}`;
 }